@@ -1,10 +1,14 @@
 """
 API Routes for the Adaptive RAG Server.
 """
+import asyncio
+import orjson
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
 from ..pipeline import run_adaptive_rag_pipeline
+from ..pipeline.orchestrator import PipelineResult
 from ..core.vector_store import get_vector_store
 
 
@@ -43,6 +47,19 @@ class HealthResponse(BaseModel):
     message: str
 
 
+def _to_response(result: PipelineResult) -> QueryResponse:
+    """Convert a pipeline result to the API response model."""
+    return QueryResponse(
+        answer=result.answer,
+        category=result.category,
+        tone=result.tone,
+        is_fallback=result.is_fallback,
+        success=result.success,
+        logs=result.rendered_logs(),
+        detailed_trace=result.rendered_trace()
+    )
+
+
 # ============ Endpoints ============
 
 @router.get("/health", response_model=HealthResponse, tags=["System"])
@@ -94,17 +111,49 @@ async def process_query(request: QueryRequest):
     if not request.query.strip():
         raise HTTPException(status_code=400, detail="Query cannot be empty")
     
-    result = run_adaptive_rag_pipeline(request.query)
+    result = await run_adaptive_rag_pipeline(request.query)
     
-    return QueryResponse(
-        answer=result.answer,
-        category=result.category,
-        tone=result.tone,
-        is_fallback=result.is_fallback,
-        success=result.success,
-        logs=result.logs,
-        detailed_trace=result.detailed_trace
-    )
+    return _to_response(result)
+
+
+@router.post("/query/stream", tags=["RAG"])
+async def stream_query(request: QueryRequest):
+    """
+    Process a medical query and stream progress as Server-Sent Events.
+    
+    Events:
+    - `generation_start`: a new answer draft begins (discard any earlier tokens)
+    - `token`: `{"text": ...}` answer fragment as the LLM produces it
+    - `verdict`: `{"cycle", "retrieval", "hallucination", "relevant"}` judgment of
+      the draft just streamed; a failing draft is followed by a regenerated one or a retry
+    - `result`: the final QueryResponse, sent once verification has finished
+    """
+    if not request.query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty")
+    
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    async def emit(event: str, data: dict) -> None:
+        await queue.put((event, data))
+    
+    async def run() -> None:
+        try:
+            result = await run_adaptive_rag_pipeline(request.query, on_event=emit)
+            await queue.put(("result", _to_response(result).model_dump()))
+        finally:
+            await queue.put(None)
+    
+    async def event_stream():
+        task = asyncio.create_task(run())
+        try:
+            while (item := await queue.get()) is not None:
+                event, data = item
+                yield f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+        finally:
+            # Client went away: stop the pipeline instead of finishing unread work
+            task.cancel()
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
 @router.get("/", tags=["System"])
@@ -116,6 +165,7 @@ async def root():
         "description": "Production-ready Adaptive RAG system for medical guideline stewardship",
         "endpoints": {
             "health": "/api/health",
-            "query": "/api/query (POST)"
+            "query": "/api/query (POST)",
+            "query_stream": "/api/query/stream (POST, text/event-stream)"
         }
     }
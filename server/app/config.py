@@ -13,31 +13,79 @@ class Settings(BaseSettings):
     # API Configuration
     app_name: str = "Adaptive RAG API"
     debug: bool = False
+    log_level: str = "INFO"
+    log_json: bool = False  # JSON lines instead of plain text
+    workers: int = 1  # Uvicorn worker processes for `python -m app.main`
     
     # LLM Configuration
     llm_api_key: str = ""
     llm_base_url: str = "https://api.groq.com/openai/v1"
     llm_model_name: str = "llama-3.3-70b-versatile"
     llm_temperature: float = 0.1
-    llm_max_retries: int = 2
+    llm_json_mode: bool = True  # Send response_format=json_object for JSON prompts
+    llm_max_retries: int = 2  # Retries after the first attempt
+    llm_base_delay: float = 1.0  # Seconds, doubled on every retry
+    llm_max_delay: float = 30.0
+    llm_rate_limit_cooldown: float = 2.0  # Seconds every request waits after any 429
+    llm_concurrency: int = 16  # Max in-flight LLM requests per worker
+    llm_http2: bool = True  # Multiplex requests over HTTP/2 (needs the h2 package)
+    llm_cache_size: int = 4096  # 0 disables response caching
+    llm_cache_ttl: int = 3600  # Seconds
+    llm_cache_max_temperature: float = 0.2  # Only cache near-deterministic calls
     
     # Embedding Model
     embedding_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    embedding_backend: str = "torch"  # "torch" or "onnx" (int8, see export_onnx.py)
+    embedding_onnx_dir: str = "./onnx/all-MiniLM-L6-v2"
+    embedding_onnx_file: str = "model_int8.onnx"
+    embedding_cache_size: int = 4096
+    embedding_cache_path: str = "./cache/embeddings.sqlite"  # Empty disables the disk tier
+    embedding_cache_disk_size: int = 100_000  # Vectors kept on disk, oldest writes dropped first; 0 = unbounded
+    
+    # Reranker (local retrieval grading)
+    rerank_enabled: bool = True  # False grades retrieval with the LLM instead
+    rerank_model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+    rerank_threshold: float = 0.5  # Top document probability needed for a GOOD grade
     
     # Vector Store
     vector_store_dir: str = "./vector_store"
+    faiss_nprobe: int = 8  # IVF lists scanned per query
+    faiss_ef_search: int = 64  # HNSW candidate list size per query
+    faiss_rescore_k_factor: int = 4  # Quantized candidates per result re-ranked in fp32 (RFlat indexes)
+    faiss_threads: int = 0  # OpenMP threads for search, 0 = this worker's share of cores
+    faiss_mmap: bool = True  # Map IVF inverted lists read-only so workers share them in the page cache
+    faiss_hugepages: bool = True  # madvise(MADV_HUGEPAGE) on large flat indexes
+    faiss_batching: bool = True  # Coalesce concurrent searches into one index.search
+    faiss_batch_window_ms: float = 5.0
+    faiss_max_batch: int = 32
     
     # Domain Configuration
     domain_text: str = "Rational antibiotic use, antimicrobial resistance, stewardship, microbiology, guideline-based reasoning"
+    lexical_domain_filter: bool = True
+    domain_keywords: list[str] = [
+        "antibiotic", "antimicrobial", "antibacterial", "antifungal", "antiviral",
+        "antimicrobial resistance", "stewardship", "microbiology", "microbial",
+        "bacteria", "bacterial", "pathogen", "infection", "infectious", "sepsis",
+        "pneumonia", "meningitis", "cellulitis", "urinary tract", "tuberculosis",
+        "penicillin", "amoxicillin", "cephalosporin", "carbapenem", "vancomycin",
+        "macrolide", "fluoroquinolone", "aminoglycoside", "beta-lactam",
+        "mrsa", "esbl", "susceptibility", "empiric", "prophylaxis"
+    ]
     
     # RAG Pipeline Settings
     retriever_top_k: int = 3
     kb_coverage_threshold: float = 0.45
     max_pipeline_retries: int = 2
+    speculative_retry: bool = False  # Race the next cycle against the current one (more LLM calls)
     
     # CORS Settings
     cors_origins: list[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
     
+    @property
+    def cpu_threads_per_worker(self) -> int:
+        """Cores available to each worker process for FAISS / torch thread pools."""
+        return max(1, (os.cpu_count() or 1) // max(1, self.workers))
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -1,6 +1,18 @@
 # Core modules for Adaptive RAG
-from .llm import LLMClient
-from .embeddings import EmbeddingService
-from .vector_store import VectorStoreService
+# Services load lazily, so light modules (doc_store, onnx_encoder) can be
+# imported by the indexing scripts without torch, faiss or httpx.
+import importlib
 
-__all__ = ["LLMClient", "EmbeddingService", "VectorStoreService"]
+_EXPORTS = {
+    "LLMClient": ".llm",
+    "EmbeddingService": ".embeddings",
+    "VectorStoreService": ".vector_store",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,81 @@
+"""
+Micro-batcher for FAISS searches.
+Concurrent single-query searches that arrive within a short window are
+stacked into one index.search call, amortizing per-call setup.
+"""
+import asyncio
+from typing import Optional
+import faiss
+import numpy as np
+
+
+class BatchedFaissSearcher:
+    """Coalesces concurrent single-vector searches into batched index.search calls."""
+
+    def __init__(self, index: faiss.Index, batch_window_ms: float = 5.0, max_batch: int = 32):
+        self.index = index
+        self.batch_window = batch_window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self) -> None:
+        """Start the background batching loop on the running event loop."""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def search_one(self, vector: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Search for a single query vector.
+
+        Args:
+            vector: Query embedding of shape (d,) or (1, d)
+            k: Number of neighbors
+
+        Returns:
+            (distances, ids), each of shape (1, k), as from index.search
+        """
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((vector.reshape(-1), k, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+
+            # Take what is already queued, then wait out the window for stragglers
+            deadline = loop.time() + self.batch_window
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._search_batch(batch)
+
+    async def _search_batch(self, batch: list[tuple[np.ndarray, int, asyncio.Future]]) -> None:
+        vectors = np.stack([vector for vector, _, _ in batch]).astype(np.float32, copy=False)
+        k = max(k for _, k, _ in batch)
+
+        try:
+            # FAISS releases the GIL, so the event loop keeps serving while it scans
+            D, I = await asyncio.get_running_loop().run_in_executor(None, self.index.search, vectors, k)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for row, (_, k_i, future) in enumerate(batch):
+            # The caller may have been cancelled while waiting
+            if not future.done():
+                future.set_result((D[row:row + 1, :k_i], I[row:row + 1, :k_i]))
@@ -0,0 +1,84 @@
+"""
+Document store for chunk text and metadata, addressed by FAISS row id.
+Backed by a read-only, memory-mapped SQLite file instead of pickled dicts.
+"""
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+
+DOC_STORE_FILE = "docs.sqlite"
+
+# 256 MB of the file is served through mmap instead of read() syscalls
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+class DocStore:
+    """Read-only lookup of (source, content) by row id."""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self.conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self._lock = threading.Lock()
+
+    def get(self, idx: int) -> Optional[tuple[str, str]]:
+        """
+        Fetch one chunk.
+
+        Args:
+            idx: FAISS row id (== chunk_id)
+
+        Returns:
+            Tuple of (source, content) or None if the id is unknown
+        """
+        # sqlite3 keeps the compiled statement in its cache, so this is a single prepared lookup
+        with self._lock:
+            return self.conn.execute(
+                "SELECT source, content FROM docs WHERE id = ?", (int(idx),)
+            ).fetchone()
+
+    def get_many(self, ids: Iterable[int]) -> dict[int, tuple[str, str]]:
+        """
+        Fetch several chunks with one query.
+
+        Args:
+            ids: FAISS row ids (== chunk_ids)
+
+        Returns:
+            Dict of id -> (source, content); unknown ids are absent
+        """
+        ids = [int(i) for i in ids]
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT id, source, content FROM docs WHERE id IN ({placeholders})", ids
+            ).fetchall()
+        return {row[0]: (row[1], row[2]) for row in rows}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+
+def write_doc_store(path: str, rows: Iterable[tuple[int, int, str, int, str]]) -> None:
+    """
+    Write a document store file, replacing any existing one.
+
+    Args:
+        path: Output file path
+        rows: Tuples of (chunk_id, doc_id, source, position, content)
+    """
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS docs")
+        conn.execute(
+            "CREATE TABLE docs ("
+            "id INTEGER PRIMARY KEY, doc_id INTEGER, source TEXT, position INTEGER, content TEXT)"
+        )
+        conn.executemany("INSERT INTO docs VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.execute("VACUUM")
+    finally:
+        conn.close()
@@ -0,0 +1,48 @@
+"""
+Lexical pre-filter for domain relevance.
+One compiled-regex scan settles clearly in-domain queries without running
+the embedding model; everything else falls through to embeddings.
+"""
+import re
+from typing import Iterable, Optional
+
+
+class DomainKeywordFilter:
+    """Keyword matcher that short-circuits the domain-relevance check."""
+
+    def __init__(
+        self,
+        keywords: Iterable[str],
+        in_domain_score: float = 0.9,
+        min_matches: int = 2
+    ):
+        self.in_domain_score = in_domain_score
+        self.min_matches = min_matches
+
+        # Longest first so multi-word keywords win over their prefixes;
+        # only the start is anchored so plurals ("antibiotics") still match
+        terms = sorted({k.strip().lower() for k in keywords if k.strip()}, key=len, reverse=True)
+        self._pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, terms)) + ")") if terms else None
+
+    def score(self, query: str) -> Optional[float]:
+        """
+        Decide relevance lexically when the query is obviously in-domain.
+
+        A keyword list can't prove a query off-domain (drug names, organisms
+        and abbreviations like "UTI" are endless), so a lack of matches is
+        left to the embedding check.
+
+        Args:
+            query: The user's query
+
+        Returns:
+            A fixed high relevance score, or None if the embedding should decide
+        """
+        if self._pattern is None:
+            return None
+
+        matches = set(self._pattern.findall(query.lower()))
+        if len(matches) >= self.min_matches:
+            return self.in_domain_score
+
+        return None
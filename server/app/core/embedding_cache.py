@@ -0,0 +1,115 @@
+"""
+Content-addressed cache for text embeddings.
+An in-process LRU backed by an on-disk SQLite store, keyed on (model, text).
+"""
+import logging
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingCache:
+    """Two-tier (memory + SQLite) cache of float32 embedding vectors."""
+
+    def __init__(self, model_name: str, path: str = "", max_size: int = 4096, disk_max_size: int = 100_000):
+        self.model_name = model_name
+        self.max_size = max_size
+        self.disk_max_size = disk_max_size
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                # Short busy timeout: a contended cache is skipped, not waited on
+                self._db = sqlite3.connect(path, timeout=0.5, check_same_thread=False)
+                # Readers don't block on another worker's writes
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings (key BLOB PRIMARY KEY, vector BLOB NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                logger.warning("⚠️ Embedding disk cache disabled: %s", e)
+                self._db = None
+
+    def _key(self, text: str) -> bytes:
+        """Content address of a text for the current model."""
+        return hashlib.blake2b(
+            f"{self.model_name}\0{text}".encode("utf-8"),
+            digest_size=32
+        ).digest()
+
+    def _remember(self, text: str, vector: np.ndarray) -> None:
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[text] = vector
+        self._memory.move_to_end(text)
+        if len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: list[str]) -> list[Optional[np.ndarray]]:
+        """
+        Look up cached vectors.
+
+        Args:
+            texts: Texts to look up
+
+        Returns:
+            List aligned with texts, holding the vector or None on a miss
+            (disk read errors count as misses)
+        """
+        results: list[Optional[np.ndarray]] = []
+        with self._lock:
+            use_disk = self._db is not None
+            for text in texts:
+                vector = self._memory.get(text)
+                if vector is not None:
+                    self._memory.move_to_end(text)
+                elif use_disk:
+                    try:
+                        row = self._db.execute(
+                            "SELECT vector FROM embeddings WHERE key = ?", (self._key(text),)
+                        ).fetchone()
+                    except sqlite3.Error as e:
+                        # Locked by another worker, I/O error, corruption: recompute instead
+                        logger.warning("⚠️ Embedding disk cache read failed: %s", e)
+                        use_disk = False
+                        row = None
+                    if row is not None:
+                        # Read-only view over the stored bytes; cached vectors are shared
+                        vector = np.frombuffer(row[0], dtype=np.float32)
+                        self._remember(text, vector)
+                results.append(vector)
+        return results
+
+    def put_many(self, texts: list[str], vectors: np.ndarray) -> None:
+        """Store freshly computed vectors in both tiers."""
+        with self._lock:
+            rows = []
+            for text, vector in zip(texts, vectors):
+                vector = np.ascontiguousarray(vector, dtype=np.float32)
+                vector.flags.writeable = False
+                self._remember(text, vector)
+                rows.append((self._key(text), vector.tobytes()))
+
+            if self._db is not None and rows:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)", rows
+                    )
+                    if self.disk_max_size > 0:
+                        # Rowids grow with every write: keep only the newest disk_max_size
+                        self._db.execute(
+                            "DELETE FROM embeddings WHERE rowid <= (SELECT MAX(rowid) FROM embeddings) - ?",
+                            (self.disk_max_size,)
+                        )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logger.warning("⚠️ Embedding disk cache write failed: %s", e)
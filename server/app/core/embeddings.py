@@ -1,11 +1,17 @@
 """
 Embedding service for text vectorization using Sentence Transformers.
 """
+import logging
 import numpy as np
-from typing import Optional
+import torch
+from typing import Optional, Union
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 from ..config import get_settings
+from .embedding_cache import EmbeddingCache
+from .domain_filter import DomainKeywordFilter
+from .onnx_encoder import OnnxSentenceEncoder
+
+logger = logging.getLogger(__name__)
 
 
 class EmbeddingService:
@@ -13,8 +19,13 @@ class EmbeddingService:
     
     def __init__(self):
         self.settings = get_settings()
-        self.model: Optional[SentenceTransformer] = None
+        self.model: Optional[Union[SentenceTransformer, OnnxSentenceEncoder]] = None
+        self.backend = "torch"
         self.domain_embedding: Optional[np.ndarray] = None
+        self.cache: Optional[EmbeddingCache] = None
+        self.domain_filter = DomainKeywordFilter(
+            self.settings.domain_keywords if self.settings.lexical_domain_filter else []
+        )
         
     def initialize(self) -> bool:
         """
@@ -24,20 +35,96 @@ class EmbeddingService:
             True if successful, False otherwise
         """
         try:
-            print(f"Loading Embedding Model: {self.settings.embedding_model_name}...")
-            self.model = SentenceTransformer(self.settings.embedding_model_name)
-            self.domain_embedding = self.model.encode(self.settings.domain_text)
-            print("✅ Embedding Model Loaded.")
+            logger.info("Loading Embedding Model: %s...", self.settings.embedding_model_name)
+            self.model = self._load_model()
+            domain_vec = self.model.encode(self.settings.domain_text)
+            self.domain_embedding = (domain_vec / np.linalg.norm(domain_vec)).astype(np.float32)
+            self.cache = EmbeddingCache(
+                # int8 ONNX vectors differ slightly from fp32 ones, keep them apart
+                f"{self.settings.embedding_model_name}:{self.backend}",
+                path=self.settings.embedding_cache_path,
+                max_size=self.settings.embedding_cache_size,
+                disk_max_size=self.settings.embedding_cache_disk_size
+            )
+            logger.info("✅ Embedding Model Loaded.", extra={"backend": self.backend})
             return True
         except Exception as e:
-            print(f"❌ Failed to load embedding model: {e}")
+            logger.exception("❌ Failed to load embedding model: %s", e)
             return False
     
+    def _load_model(self) -> Union[SentenceTransformer, OnnxSentenceEncoder]:
+        """Load the ONNX Runtime encoder if configured, else the PyTorch model."""
+        if self.settings.embedding_backend == "onnx":
+            try:
+                model = OnnxSentenceEncoder(
+                    self.settings.embedding_onnx_dir,
+                    model_file=self.settings.embedding_onnx_file,
+                    num_threads=self.settings.cpu_threads_per_worker
+                )
+                self.backend = "onnx"
+                logger.info("⚡ Using ONNX Runtime encoder from %s", self.settings.embedding_onnx_dir)
+                return model
+            except Exception as e:
+                logger.warning("⚠️ ONNX encoder unavailable (%s). Falling back to PyTorch.", e)
+        
+        self.backend = "torch"
+        # This worker's share of the cores (encode() already runs without autograd)
+        torch.set_num_threads(self.settings.cpu_threads_per_worker)
+        return SentenceTransformer(self.settings.embedding_model_name)
+    
+    def warmup(self) -> Optional[np.ndarray]:
+        """
+        Run a throwaway forward pass so lazy kernel setup happens at startup.
+        
+        Returns:
+            The (1, dim) warmup embedding, or None if the model is not loaded
+        """
+        if self.model is None:
+            return None
+        # Bypasses the cache so the dummy text is never stored
+        vec = self.model.encode(["warmup query"], convert_to_numpy=True, normalize_embeddings=True)
+        return np.ascontiguousarray(vec, dtype=np.float32)
+    
     def encode(self, text: str) -> np.ndarray:
         """Encode text to vector embedding."""
-        if self.model is None:
+        return self.encode_batch([text])[0]
+    
+    def encode_batch(self, texts: list[str]) -> np.ndarray:
+        """
+        Encode several texts, running the model only on cache misses.
+        
+        Args:
+            texts: Texts to encode
+            
+        Returns:
+            Unit-normalized, C-contiguous float32 array of shape (len(texts), dim)
+            in input order
+        """
+        if self.model is None or self.cache is None:
             raise RuntimeError("Embedding model not initialized")
-        return self.model.encode(text)
+        
+        keys = [t.strip() for t in texts]
+        vectors = self.cache.get_many(keys)
+        
+        misses = [i for i, v in enumerate(vectors) if v is None]
+        if misses:
+            # One forward pass over the distinct missing texts
+            miss_texts = list(dict.fromkeys(keys[i] for i in misses))
+            # Unit-length vectors let similarity be a plain dot product
+            encoded = self.model.encode(
+                miss_texts,
+                batch_size=32,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            )
+            encoded = encoded.astype(np.float32, copy=False)
+            self.cache.put_many(miss_texts, encoded)
+            
+            fresh = dict(zip(miss_texts, encoded))
+            for i in misses:
+                vectors[i] = fresh[keys[i]]
+        
+        return np.stack(vectors).astype(np.float32, copy=False)
     
     def get_domain_relevance(self, query_text: str) -> float:
         """
@@ -52,8 +139,13 @@ class EmbeddingService:
         if not query_text or self.domain_embedding is None:
             return 0.0
         
+        # Obviously in-domain queries are decided without a model forward pass
+        lexical_score = self.domain_filter.score(query_text)
+        if lexical_score is not None:
+            return lexical_score
+        
         query_embedding = self.encode(query_text)
-        return float(cosine_similarity([query_embedding], [self.domain_embedding])[0][0])
+        return float(np.dot(query_embedding, self.domain_embedding))
     
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """
@@ -66,9 +158,8 @@ class EmbeddingService:
         Returns:
             Cosine similarity score (0-1)
         """
-        emb1 = self.encode(text1)
-        emb2 = self.encode(text2)
-        return float(cosine_similarity([emb1], [emb2])[0][0])
+        embs = self.encode_batch([text1, text2])
+        return float(embs[0] @ embs[1])
 
 
 # Singleton instance
@@ -1,77 +1,319 @@
 """
 LLM Client wrapper for making API calls to OpenAI-compatible endpoints.
 """
+import logging
+import asyncio
+import importlib.util
+import random
+import re
 import time
 import httpx
-from typing import Optional
+import orjson
+from typing import Any, AsyncIterator, Optional
 from ..config import get_settings
+from .llm_cache import CacheManager, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+# Transient provider failures worth another attempt
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Outermost {...} block, ignoring code fences or chatter around it
+_JSON_RE = re.compile(r'\{.*\}', re.S)
+
+
+def parse_json_object(response: str) -> Optional[dict[str, Any]]:
+    """
+    Extract the JSON object from an LLM response in one pass.
+    
+    Args:
+        response: Raw model output, possibly wrapped in ```json fences or prose
+        
+    Returns:
+        The decoded object, or None if there is no valid JSON object
+    """
+    match = _JSON_RE.search(response)
+    if match is None:
+        return None
+    try:
+        data = orjson.loads(match.group(0))
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
 
 
 class LLMClient:
-    """Client for interacting with LLM API (Groq, OpenAI, etc.)."""
+    """Async client for interacting with LLM API (Groq, OpenAI, etc.)."""
     
     def __init__(self):
         self.settings = get_settings()
-        self.client = httpx.Client(timeout=30.0)
+        # Auth header and base URL are fixed per client, build them once
+        self._headers = {
+            "Authorization": f"Bearer {self.settings.llm_api_key}",
+            "Content-Type": "application/json"
+        }
+        # Pooled keep-alive connections shared by every concurrent request;
+        # HTTP/2 multiplexes them over a few sockets when the provider supports it
+        self.client = httpx.AsyncClient(
+            base_url=self.settings.llm_base_url,
+            headers=self._headers,
+            timeout=30.0,
+            # httpx refuses http2=True without the optional h2 package
+            http2=self.settings.llm_http2 and importlib.util.find_spec("h2") is not None,
+            limits=httpx.Limits(
+                max_connections=100,
+                max_keepalive_connections=64,
+                keepalive_expiry=30
+            )
+        )
+        # Client-side throttle on concurrent outbound calls
+        self._semaphore = asyncio.Semaphore(self.settings.llm_concurrency)
+        # Near-deterministic responses, keyed by the full request payload
+        self._cache = CacheManager(
+            max_size=self.settings.llm_cache_size,
+            default_ttl=self.settings.llm_cache_ttl
+        )
+        # Cacheable requests currently on the wire, by cache key
+        self._inflight: dict[str, asyncio.Future] = {}
+        # Last 429 seen by any caller; starts a cooldown shared by all requests
+        self._last_429_at: Optional[float] = None
+    
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """
+        Seconds to wait before retrying.
+        
+        Honors the provider's Retry-After header when present, otherwise uses
+        exponential backoff with jitter, capped at llm_max_delay.
+        """
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.settings.llm_max_delay)
+                except ValueError:
+                    pass  # HTTP-date form, fall back to exponential
+        
+        delay = self.settings.llm_base_delay * 2 ** attempt + random.uniform(0, 1)
+        return min(delay, self.settings.llm_max_delay)
+    
+    def should_wait(self) -> float:
+        """Seconds left in the shared rate-limit cooldown (0 if none)."""
+        if self._last_429_at is None:
+            return 0.0
+        return max(0.0, self._last_429_at + self.settings.llm_rate_limit_cooldown - time.monotonic())
     
-    def call(
+    async def _wait_for_cooldown(self) -> None:
+        """Hold a request back while the provider is rate limiting us, instead of sending it to fail."""
+        delay = self.should_wait()
+        if delay > 0:
+            # Jitter keeps the held-back requests from resuming in lockstep
+            await asyncio.sleep(delay + random.uniform(0, 0.25))
+    
+    def _prepare(
+        self,
+        messages: list[dict],
+        temperature: Optional[float],
+        response_format: Optional[dict] = None,
+        use_cache: bool = True
+    ) -> tuple[dict, Optional[str]]:
+        """Build the request payload and its response-cache key (None if uncacheable)."""
+        payload = {
+            "model": self.settings.llm_model_name,
+            "messages": messages,
+            # An explicit 0.0 is a real request for greedy decoding, not "unset"
+            "temperature": self.settings.llm_temperature if temperature is None else temperature
+        }
+        if response_format is not None:
+            payload["response_format"] = response_format
+        
+        # Sampled (higher temperature) answers are not frozen into the cache
+        cache_key = None
+        if use_cache and payload["temperature"] <= self.settings.llm_cache_max_temperature:
+            cache_key = make_cache_key(payload)
+        return payload, cache_key
+    
+    async def call(
         self,
         messages: list[dict],
-        temperature: Optional[float] = None
+        temperature: Optional[float] = None,
+        response_format: Optional[dict] = None,
+        use_cache: bool = True
     ) -> Optional[str]:
         """
-        Make a call to the LLM API with retry logic for rate limits.
+        Make a call to the LLM API with retry logic for rate limits and transient errors.
         
         Args:
             messages: List of message dicts with 'role' and 'content'
             temperature: Override default temperature if provided
-            
+            response_format: OpenAI-style response format, e.g. {"type": "json_object"}
+            use_cache: False always sends a fresh request (e.g. to regenerate an answer)
+        
         Returns:
             Response content string or None if failed
         """
         if not self.settings.llm_api_key:
             return None
-            
-        headers = {
-            "Authorization": f"Bearer {self.settings.llm_api_key}",
-            "Content-Type": "application/json"
-        }
         
-        payload = {
-            "model": self.settings.llm_model_name,
-            "messages": messages,
-            "temperature": temperature or self.settings.llm_temperature
-        }
+        payload, cache_key = self._prepare(messages, temperature, response_format, use_cache)
+        if cache_key is None:
+            return await self._send(payload, None)
+        
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        for i in range(self.settings.llm_max_retries):
+        # Identical requests from concurrent users share one provider call
+        future = self._inflight.get(cache_key)
+        if future is None:
+            future = asyncio.ensure_future(self._send(payload, cache_key))
+            self._inflight[cache_key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(cache_key, None))
+        # A cancelled caller must not cancel the call others are waiting on
+        return await asyncio.shield(future)
+    
+    async def _send(self, payload: dict, cache_key: Optional[str]) -> Optional[str]:
+        """POST a chat completion with retries, caching the content under cache_key."""
+        # Serialized once and re-sent as-is on every retry
+        body = orjson.dumps(payload)
+        
+        max_attempts = self.settings.llm_max_retries + 1
+        for attempt in range(max_attempts):
+            is_last = attempt + 1 == max_attempts
             try:
-                response = self.client.post(
-                    f"{self.settings.llm_base_url}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
+                await self._wait_for_cooldown()
+                async with self._semaphore:
+                    response = await self.client.post("/chat/completions", content=body)
                 response.raise_for_status()
-                return response.json()['choices'][0]['message']['content']
-                
+                content = response.json()['choices'][0]['message']['content']
+                if cache_key is not None:
+                    self._cache.set(cache_key, content)
+                return content
+            
             except httpx.HTTPStatusError as e:
-                if e.response.status_code == 429:
-                    wait_time = 2 * (i + 1)
-                    print(f"⚠️ Rate Limit (429). Retrying in {wait_time}s...")
-                    time.sleep(wait_time)
+                status = e.response.status_code
+                if status == 429:
+                    self._last_429_at = time.monotonic()
+                if status in RETRYABLE_STATUS_CODES and not is_last:
+                    wait_time = self._backoff(attempt, e.response)
+                    logger.warning(
+                        "⚠️ %s. Retrying in %.1fs...",
+                        "Rate Limit (429)" if status == 429 else f"Server Error ({status})", wait_time,
+                        extra={"status": status, "retry_in_s": wait_time, "attempt": attempt + 1}
+                    )
+                    await asyncio.sleep(wait_time)
                     continue
-                print(f"❌ LLM Call Failed: {e}")
+                logger.error("❌ LLM Call Failed: %s", e)
                 return None
-                
+            
+            except (httpx.ConnectError, httpx.ReadTimeout) as e:
+                if not is_last:
+                    wait_time = self._backoff(attempt)
+                    logger.warning(
+                        "⚠️ LLM connection error (%s). Retrying in %.1fs...", type(e).__name__, wait_time,
+                        extra={"retry_in_s": wait_time, "attempt": attempt + 1}
+                    )
+                    await asyncio.sleep(wait_time)
+                    continue
+                logger.error("❌ LLM Call Failed: %s", e)
+                return None
+            
             except Exception as e:
-                print(f"❌ LLM Call Failed: {e}")
+                logger.error("❌ LLM Call Failed: %s", e)
                 return None
-                
+        
         return None
     
-    def __del__(self):
-        """Clean up HTTP client."""
-        if hasattr(self, 'client'):
-            self.client.close()
+    async def stream_call(
+        self,
+        messages: list[dict],
+        temperature: Optional[float] = None,
+        use_cache: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Stream a chat completion as content deltas (server-sent events).
+        
+        Failures before the first token are retried like call(); a stream that
+        breaks midway is not restarted.
+        
+        Args:
+            messages: List of message dicts with 'role' and 'content'
+            temperature: Override default temperature if provided
+            use_cache: False always streams a fresh completion
+            
+        Yields:
+            Content fragments in arrival order (nothing if the call fails)
+        """
+        if not self.settings.llm_api_key:
+            return
+        
+        payload, cache_key = self._prepare(messages, temperature, use_cache=use_cache)
+        if cache_key is not None:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        body = orjson.dumps({**payload, "stream": True})
+        parts: list[str] = []
+        
+        max_attempts = self.settings.llm_max_retries + 1
+        for attempt in range(max_attempts):
+            can_retry = attempt + 1 < max_attempts and not parts
+            try:
+                await self._wait_for_cooldown()
+                async with self._semaphore:
+                    async with self.client.stream("POST", "/chat/completions", content=body) as response:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[5:].strip()
+                            if data == "[DONE]":
+                                break
+                            delta = orjson.loads(data)['choices'][0]['delta'].get('content')
+                            if delta:
+                                parts.append(delta)
+                                yield delta
+                break
+            
+            except httpx.HTTPStatusError as e:
+                status = e.response.status_code
+                if status == 429:
+                    self._last_429_at = time.monotonic()
+                if status in RETRYABLE_STATUS_CODES and can_retry:
+                    wait_time = self._backoff(attempt, e.response)
+                    logger.warning(
+                        "⚠️ LLM stream HTTP %s. Retrying in %.1fs...", status, wait_time,
+                        extra={"status": status, "retry_in_s": wait_time, "attempt": attempt + 1}
+                    )
+                    await asyncio.sleep(wait_time)
+                    continue
+                logger.error("❌ LLM Stream Failed: %s", e)
+                return
+            
+            except (httpx.ConnectError, httpx.ReadTimeout) as e:
+                if can_retry:
+                    wait_time = self._backoff(attempt)
+                    logger.warning(
+                        "⚠️ LLM stream connection error (%s). Retrying in %.1fs...", type(e).__name__, wait_time,
+                        extra={"retry_in_s": wait_time, "attempt": attempt + 1}
+                    )
+                    await asyncio.sleep(wait_time)
+                    continue
+                logger.error("❌ LLM Stream Failed: %s", e)
+                return
+            
+            except Exception as e:
+                logger.error("❌ LLM Stream Failed: %s", e)
+                return
+        
+        if cache_key is not None and parts:
+            self._cache.set(cache_key, "".join(parts))
+    
+    async def aclose(self) -> None:
+        """Close the underlying HTTP connection pool."""
+        await self.client.aclose()
 
 
 # Singleton instance
@@ -84,3 +326,11 @@ def get_llm_client() -> LLMClient:
     if _llm_client is None:
         _llm_client = LLMClient()
     return _llm_client
+
+
+async def close_llm_client() -> None:
+    """Close and discard the LLM client singleton."""
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
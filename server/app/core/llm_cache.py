@@ -0,0 +1,119 @@
+"""
+In-process LRU + TTL cache for LLM responses.
+"""
+import functools
+import hashlib
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+import orjson
+from ..config import get_settings
+
+
+def make_cache_key(payload: Any) -> str:
+    """Stable content hash of a JSON-serializable payload."""
+    data = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class CacheManager:
+    """Thread-safe LRU cache whose entries also expire after a TTL."""
+
+    def __init__(self, max_size: int = 1000, default_ttl: float = 600):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value, evicting the least recently used entry when full."""
+        if self.max_size <= 0:
+            return
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def cached(
+    cache: Optional[CacheManager] = None,
+    key: Optional[Callable[..., Any]] = None,
+    cache_if: Optional[Callable[[Any], bool]] = None
+):
+    """
+    Memoize a function (sync or async) in a CacheManager.
+
+    Args:
+        cache: Cache to use; by default a private CacheManager sized by
+            LLM_CACHE_SIZE / LLM_CACHE_TTL (LLM_CACHE_SIZE=0 disables it)
+        key: Maps the call arguments to a JSON-serializable cache key;
+            defaults to all positional and keyword arguments
+        cache_if: Decides whether a result may be stored; by default
+            everything except None (a failed call) is cached
+
+    Returns:
+        Decorator; the wrapped function exposes its cache as `.cache`
+    """
+    if cache is None:
+        settings = get_settings()
+        cache = CacheManager(max_size=settings.llm_cache_size, default_ttl=settings.llm_cache_ttl)
+    store = cache
+
+    def decorator(fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        def make_key(args, kwargs) -> str:
+            parts = key(*args, **kwargs) if key is not None else [args, kwargs]
+            return make_cache_key([name, parts])
+
+        def storable(result) -> bool:
+            return cache_if(result) if cache_if is not None else result is not None
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                k = make_key(args, kwargs)
+                hit = store.get(k)
+                if hit is not None:
+                    return hit
+                result = await fn(*args, **kwargs)
+                if storable(result):
+                    store.set(k, result)
+                return result
+        else:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                k = make_key(args, kwargs)
+                hit = store.get(k)
+                if hit is not None:
+                    return hit
+                result = fn(*args, **kwargs)
+                if storable(result):
+                    store.set(k, result)
+                return result
+
+        wrapper.cache = store
+        return wrapper
+
+    return decorator
@@ -0,0 +1,95 @@
+"""
+ONNX Runtime sentence encoder (int8-quantized MiniLM) for CPU inference.
+Drop-in replacement for the subset of SentenceTransformer.encode used by the server.
+"""
+import os
+from typing import Optional, Union
+import numpy as np
+
+
+class OnnxSentenceEncoder:
+    """Mean-pooled sentence embeddings from an exported ONNX transformer."""
+
+    def __init__(
+        self,
+        model_dir: str,
+        model_file: str = "model_int8.onnx",
+        max_seq_length: int = 256,
+        num_threads: Optional[int] = None
+    ):
+        # Optional dependencies, only needed when EMBEDDING_BACKEND=onnx
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        so = ort.SessionOptions()
+        # Defaults to every core; server workers pass their share
+        so.intra_op_num_threads = num_threads or os.cpu_count() or 1
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, model_file),
+            sess_options=so,
+            providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.max_seq_length = max_seq_length
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        """Run one padded batch through the model and mean-pool over the attention mask."""
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np"
+        )
+        feeds = {k: v.astype(np.int64) for k, v in tokens.items() if k in self._input_names}
+        last_hidden = self.session.run(None, feeds)[0]
+
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        summed = (last_hidden * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(
+        self,
+        sentences: Union[str, list[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        show_progress_bar: bool = False
+    ) -> np.ndarray:
+        """
+        Encode sentences, mirroring SentenceTransformer.encode.
+
+        Args:
+            sentences: A single text or a list of texts
+            batch_size: Texts per forward pass
+            convert_to_numpy: Accepted for compatibility (always NumPy)
+            normalize_embeddings: L2-normalize the output vectors
+            show_progress_bar: Accepted for compatibility (ignored)
+
+        Returns:
+            float32 array of shape (dim,) for a single text, else (n, dim)
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Length-sorted batches keep padding to a minimum
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            batch = [texts[i] for i in order[start:start + batch_size]]
+            chunks.append(self._encode_batch(batch))
+
+        pooled = np.concatenate(chunks)
+        out = np.empty_like(pooled)
+        out[order] = pooled
+
+        if normalize_embeddings:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+
+        out = out.astype(np.float32, copy=False)
+        return out[0] if single else out
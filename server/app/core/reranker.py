@@ -0,0 +1,84 @@
+"""
+Cross-encoder reranker for scoring query/document relevance locally.
+"""
+import logging
+from typing import Optional
+import numpy as np
+import torch
+from sentence_transformers import CrossEncoder
+from ..config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class RerankerService:
+    """Scores (query, passage) pairs with a small MS MARCO cross-encoder."""
+
+    def __init__(self):
+        self.settings = get_settings()
+        self.model: Optional[CrossEncoder] = None
+
+    @property
+    def available(self) -> bool:
+        """True once the model is loaded."""
+        return self.model is not None
+
+    def initialize(self) -> bool:
+        """
+        Load the cross-encoder model.
+
+        Returns:
+            True if successful, False if disabled or the model failed to load
+        """
+        if not self.settings.rerank_enabled:
+            return False
+        try:
+            logger.info("Loading Reranker Model: %s...", self.settings.rerank_model_name)
+            self.model = CrossEncoder(
+                self.settings.rerank_model_name,
+                max_length=512,
+                # Probabilities in [0, 1] regardless of the activation the model ships with
+                default_activation_function=torch.nn.Sigmoid()
+            )
+            logger.info("✅ Reranker Model Loaded.")
+            return True
+        except Exception as e:
+            logger.exception("❌ Failed to load reranker model: %s", e)
+            return False
+
+    def score(self, query: str, passages: list[str]) -> np.ndarray:
+        """
+        Score each passage's relevance to the query in one forward pass.
+
+        Args:
+            query: The user's query
+            passages: Candidate passages
+
+        Returns:
+            Float32 array of relevance probabilities aligned with passages
+        """
+        if self.model is None:
+            raise RuntimeError("Reranker model not initialized")
+        if not passages:
+            return np.empty(0, dtype=np.float32)
+
+        scores = self.model.predict(
+            [(query, passage) for passage in passages],
+            batch_size=32,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        return np.asarray(scores, dtype=np.float32).reshape(-1)
+
+
+# Singleton instance
+_reranker: Optional[RerankerService] = None
+
+
+def get_reranker() -> RerankerService:
+    """Get or create the reranker singleton."""
+    global _reranker
+    if _reranker is None:
+        _reranker = RerankerService()
+        _reranker.initialize()
+    return _reranker
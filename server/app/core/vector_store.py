@@ -1,13 +1,103 @@
 """
 Vector Store service for FAISS-based document retrieval.
 """
+import asyncio
+import logging
 import os
-import pickle
+import sys
+import mmap
+import ctypes
+from dataclasses import dataclass
 from typing import Optional
 import faiss
 import numpy as np
 from ..config import get_settings
 from .embeddings import get_embedding_service
+from .doc_store import DOC_STORE_FILE, DocStore
+from .batched_search import BatchedFaissSearcher
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class RetrievedDoc:
+    """One retrieved chunk; id is the FAISS row id / chunk_id."""
+    id: int
+    source: str
+    content: str
+    score: Optional[float] = None  # Exact cosine similarity from the search (None for quantized indexes)
+
+
+def has_exact_distances(index: faiss.Index) -> bool:
+    """
+    Whether the index reports exact distances for the hits it returns.
+    
+    True when the final distances come from fp32 vectors: flat, IVF-Flat and
+    HNSW-Flat indexes, or any index re-ranked by a flat refine stage (RFlat).
+    SQ/PQ codes only approximate them.
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexRefine):
+        return isinstance(faiss.downcast_index(index.refine_index), faiss.IndexFlat)
+    if isinstance(index, faiss.IndexHNSW):
+        return isinstance(faiss.downcast_index(index.storage), faiss.IndexFlat)
+    return isinstance(index, (faiss.IndexFlat, faiss.IndexIVFFlat))
+
+
+def format_contexts(docs: list[RetrievedDoc]) -> str:
+    """
+    Render retrieved documents for an LLM prompt in a single pass.
+    
+    Chunks retrieved more than once are only included the first time.
+    """
+    seen = set()
+    parts = []
+    for d in docs:
+        if d.id in seen:
+            continue
+        seen.add(d.id)
+        parts.append(f"Source: {d.source}\nContent: {d.content}")
+    return "\n".join(parts)
+
+
+MADV_HUGEPAGE = 14
+HUGE_PAGE_SIZE = 2 * 1024 * 1024
+
+
+def advise_hugepages(index: faiss.Index) -> bool:
+    """
+    Ask the kernel to back a flat (or HNSW-flat) index's vector storage with transparent huge pages.
+    
+    Fewer TLB misses on the dense scan; a no-op off Linux, for non-flat
+    indexes and for storage smaller than one huge page.
+    
+    Returns:
+        True if the advice was applied
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    
+    flat = faiss.downcast_index(index)
+    if hasattr(flat, 'hnsw'):
+        # HNSW keeps its vectors in a flat storage index
+        flat = faiss.downcast_index(flat.storage)
+    if not isinstance(flat, faiss.IndexFlat) or flat.ntotal == 0:
+        return False
+    
+    try:
+        # Zero-copy view of the stored vectors, only used for its address/size
+        xb = faiss.rev_swig_ptr(flat.get_xb(), flat.ntotal * flat.d)
+        if xb.nbytes < HUGE_PAGE_SIZE:
+            return False
+        
+        start = xb.ctypes.data & ~(mmap.PAGESIZE - 1)
+        length = xb.ctypes.data + xb.nbytes - start
+        
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.madvise.argtypes = [ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int]
+        return libc.madvise(start, length, MADV_HUGEPAGE) == 0
+    except Exception:
+        return False
 
 
 class VectorStoreService:
@@ -16,8 +106,10 @@ class VectorStoreService:
     def __init__(self):
         self.settings = get_settings()
         self.index: Optional[faiss.Index] = None
-        self.metadata_store: dict = {}
-        self.text_store: dict = {}
+        self.doc_store: Optional[DocStore] = None
+        self.searcher: Optional[BatchedFaissSearcher] = None
+        # Whether search scores can stand in for re-embedding (see has_exact_distances)
+        self.exact_scores = False
         
     def initialize(self) -> bool:
         """
@@ -29,23 +121,85 @@ class VectorStoreService:
         try:
             vector_dir = self.settings.vector_store_dir
             
-            print("Loading FAISS Index...")
-            self.index = faiss.read_index(os.path.join(vector_dir, 'index.faiss'))
+            # Chunk text first: an index without its documents is not a usable store
+            doc_store_path = os.path.join(vector_dir, DOC_STORE_FILE)
+            if not os.path.exists(doc_store_path):
+                raise FileNotFoundError(
+                    f"{doc_store_path} not found. Stores with metadata.pkl/texts.pkl "
+                    f"must be converted first: python migrate_doc_store.py {vector_dir}"
+                )
+            self.doc_store = DocStore(doc_store_path)
             
-            with open(os.path.join(vector_dir, 'metadata.pkl'), 'rb') as f:
-                self.metadata_store = pickle.load(f)
-                
-            with open(os.path.join(vector_dir, 'texts.pkl'), 'rb') as f:
-                self.text_store = pickle.load(f)
-                
-            print(f"✅ Vector Store Loaded. Total Vectors: {self.index.ntotal}")
+            logger.info("Loading FAISS Index...")
+            faiss.omp_set_num_threads(self.settings.faiss_threads or self.settings.cpu_threads_per_worker)
+            self.index = self._read_index(os.path.join(vector_dir, 'index.faiss'))
+            self._configure_search_params()
+            self.exact_scores = has_exact_distances(self.index)
+            if self.settings.faiss_hugepages and advise_hugepages(self.index):
+                logger.info("🧱 FAISS vectors advised for transparent huge pages.")
+            if self.settings.faiss_batching:
+                self.searcher = BatchedFaissSearcher(
+                    self.index,
+                    batch_window_ms=self.settings.faiss_batch_window_ms,
+                    max_batch=self.settings.faiss_max_batch
+                )
+            
+            logger.info("✅ Vector Store Loaded. Total Vectors: %d", self.index.ntotal)
             return True
             
         except Exception as e:
-            print(f"❌ Failed to load vector store: {e}")
+            logger.exception("❌ Failed to load vector store: %s", e)
+            # All or nothing, so health checks and search() see an unloaded store
+            self.index = None
+            self.searcher = None
+            self.doc_store = None
             return False
     
-    def search(self, query_text: str, k: Optional[int] = None) -> list[str]:
+    def _read_index(self, path: str) -> faiss.Index:
+        """Memory-map the index's IVF lists when configured, else read it all into process memory."""
+        if self.settings.faiss_mmap:
+            try:
+                # Only IVF inverted lists are mapped (shared via the page cache);
+                # flat and HNSW vector storage is still read into each worker's heap
+                return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError as e:
+                logger.warning("⚠️ Cannot mmap %s (%s). Reading it into memory.", path, e)
+        return faiss.read_index(path)
+    
+    def _configure_search_params(self) -> None:
+        """Apply query-time recall/speed knobs for ANN indexes (no-op for flat ones)."""
+        index = faiss.downcast_index(self.index)
+        if isinstance(index, faiss.IndexRefine):
+            # Quantized index with fp32 rescoring: size the candidate pool, then tune the base
+            index.k_factor = self.settings.faiss_rescore_k_factor
+            index = faiss.downcast_index(index.base_index)
+        
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = self.settings.faiss_nprobe
+        
+        if hasattr(index, 'hnsw'):
+            index.hnsw.efSearch = self.settings.faiss_ef_search
+    
+    async def warmup(self, query: np.ndarray) -> None:
+        """
+        Run one search down the regular path so FAISS creates its OpenMP
+        thread team (and the batcher its worker) at startup.
+        
+        Args:
+            query: A (1, d) float32 query batch
+        """
+        if self.index is None or self.index.ntotal == 0:
+            return
+        k = self.settings.retriever_top_k
+        if self.searcher is not None:
+            _, I = await self.searcher.search_one(query, k)
+        else:
+            _, I = self.index.search(query, k)
+        if self.doc_store is not None and I[0][0] != -1:
+            self.doc_store.get(int(I[0][0]))
+    
+    async def search(self, query_text: str, k: Optional[int] = None) -> list[RetrievedDoc]:
         """
         Search for relevant documents using vector similarity.
         
@@ -54,28 +208,46 @@ class VectorStoreService:
             k: Number of results to return (default from settings)
             
         Returns:
-            List of formatted document strings with source and content
+            List of retrieved documents, best match first (empty if the store is not loaded).
+            Scores are only set when the index's distances are exact.
         """
-        if self.index is None:
-            return ["[ERROR] Index not loaded"]
+        if self.index is None or self.doc_store is None:
+            return []
             
         k = k or self.settings.retriever_top_k
         embedding_service = get_embedding_service()
         
-        vector = embedding_service.encode(query_text)
-        D, I = self.index.search(np.array([vector]).astype('float32'), k)
+        # Already a (1, d) C-contiguous float32 batch, handed to FAISS without copies.
+        # Query embeddings are unit length, so inner-product indexes rank by cosine.
+        # A cache miss runs the model, so keep it off the event loop
+        query = await asyncio.to_thread(embedding_service.encode_batch, [query_text])
+        if self.searcher is not None:
+            # Shares one index.search with other in-flight queries
+            D, I = await self.searcher.search_one(query, k)
+        else:
+            D, I = await asyncio.to_thread(self.index.search, query, k)
+        
+        hits = [
+            (int(idx), self._to_cosine(dist) if self.exact_scores else None)
+            for idx, dist in zip(I[0], D[0]) if idx != -1
+        ]
+        # One round-trip to the document store for all hits
+        docs = self.doc_store.get_many([idx for idx, _ in hits])
         
         retrieved = []
-        for idx in I[0]:
-            if idx == -1:
-                continue
-            meta = self.metadata_store.get(idx, {})
-            source = meta.get('source', 'Unknown')
-            content = self.text_store.get(idx, '')
-            retrieved.append(f"Source: {source}\nContent: {content}")
+        for idx, score in hits:
+            source, content = docs.get(idx, ('Unknown', ''))
+            retrieved.append(RetrievedDoc(id=idx, source=source, content=content, score=score))
             
         return retrieved
     
+    def _to_cosine(self, distance: float) -> float:
+        """Convert a FAISS distance to cosine similarity (stored and query vectors are unit length)."""
+        if self.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+            return float(distance)
+        # Squared L2 between unit vectors: |a - b|^2 = 2 - 2 cos
+        return 1.0 - float(distance) / 2
+    
     @property
     def total_vectors(self) -> int:
         """Get the total number of vectors in the index."""
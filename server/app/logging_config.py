@@ -0,0 +1,55 @@
+"""
+Logging setup for the Adaptive RAG Server.
+Handlers only enqueue records; a background QueueListener thread formats
+and writes them, so a slow stdout never blocks the event loop.
+"""
+import json
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Attributes every LogRecord carries; anything else arrived via `extra=`
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(name)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, including any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        # QueueHandler has already folded any traceback into the message
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = "INFO", json_logs: bool = False) -> QueueListener:
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Args:
+        level: Root log level name
+        json_logs: Emit JSON lines instead of plain text
+
+    Returns:
+        The started QueueListener; call .stop() on shutdown to flush it
+    """
+    log_queue = queue.SimpleQueue()
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if json_logs else logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    root.handlers = [QueueHandler(log_queue)]
+    root.setLevel(level.upper())
+
+    listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -3,6 +3,7 @@ Adaptive RAG Server - FastAPI Application Entry Point
 
 Production-ready API for the Adaptive RAG medical guideline assistant.
 """
+import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -10,7 +11,12 @@ from fastapi.middleware.cors import CORSMiddleware
 from .config import get_settings
 from .api import router
 from .core.embeddings import get_embedding_service
+from .core.llm import get_llm_client, close_llm_client
+from .core.reranker import get_reranker
 from .core.vector_store import get_vector_store
+from .logging_config import setup_logging
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
@@ -19,21 +25,39 @@ async def lifespan(app: FastAPI):
     Lifespan context manager for startup/shutdown events.
     Initializes heavy resources (models, vector store) at startup.
     """
-    print("🚀 Starting Adaptive RAG Server...")
+    settings = get_settings()
+    log_listener = setup_logging(settings.log_level, json_logs=settings.log_json)
+    logger.info("🚀 Starting Adaptive RAG Server...")
     
     # Initialize services at startup
-    print("📦 Loading embedding model...")
-    get_embedding_service()
+    logger.info("📦 Loading embedding model...")
+    embedding_service = get_embedding_service()
+    
+    if settings.rerank_enabled:
+        logger.info("📦 Loading reranker model...")
+        get_reranker()
     
-    print("📂 Loading vector store...")
-    get_vector_store()
+    logger.info("📂 Loading vector store...")
+    vector_store = get_vector_store()
     
-    print("✅ Server ready!")
+    # Pay cold-start costs (kernel setup, OpenMP team) before the first user query
+    logger.info("🔥 Warming up embedding model and index...")
+    warmup_vec = embedding_service.warmup()
+    if warmup_vec is not None:
+        await vector_store.warmup(warmup_vec)
+    
+    # Create the pooled LLM client on the server's event loop
+    get_llm_client()
+    
+    logger.info("✅ Server ready!")
     
     yield
     
     # Cleanup on shutdown
-    print("👋 Shutting down server...")
+    logger.info("👋 Shutting down server...")
+    await close_llm_client()
+    # Flush whatever is still queued
+    log_listener.stop()
 
 
 def create_app() -> FastAPI:
@@ -83,9 +107,12 @@ app = create_app()
 
 if __name__ == "__main__":
     import uvicorn
+    settings = get_settings()
     uvicorn.run(
         "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=settings.debug,
+        # Reload runs a single process; otherwise fork one process per worker
+        workers=1 if settings.debug else settings.workers
     )
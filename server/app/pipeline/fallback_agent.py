@@ -50,7 +50,7 @@ DO NOT:
 """
 
 
-def generate_fallback_response(
+async def generate_fallback_response(
     user_query: str,
     category: str,
     tone: str
@@ -68,7 +68,7 @@ def generate_fallback_response(
     """
     llm = get_llm_client()
     
-    response = llm.call([
+    response = await llm.call([
         {"role": "system", "content": FALLBACK_SYSTEM_PROMPT},
         {"role": "user", "content": f"Category: {category}\nTone: {tone}\nQuestion: {user_query}"}
     ], temperature=0.3)
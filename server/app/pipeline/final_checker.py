@@ -5,7 +5,7 @@ Ensures the answer actually addresses the user's original question.
 from ..core.llm import get_llm_client
 
 
-def check_answer_relevance(answer: str, original_query: str) -> str:
+async def check_answer_relevance(answer: str, original_query: str) -> str:
     """
     Check if the answer addresses the original question.
     
@@ -20,7 +20,7 @@ def check_answer_relevance(answer: str, original_query: str) -> str:
     
     prompt = f"Query: {original_query}\nAnswer: {answer}\nDoes it answer? Output YES or NO."
     
-    response = llm.call([{"role": "user", "content": prompt}])
+    response = await llm.call([{"role": "user", "content": prompt}])
     
     if response and "YES" in response.upper():
         return "YES"
@@ -2,36 +2,79 @@
 Phase 7: Answer Generator (Tone-Aware)
 Generates the final answer using retrieved context with appropriate tone.
 """
-from typing import Optional
+from typing import AsyncIterator, Awaitable, Callable, Optional
 from ..core.llm import get_llm_client
+from ..core.vector_store import RetrievedDoc, format_contexts
 
 
-def generate_answer(
+# Receives each answer fragment as it streams in
+TokenSink = Callable[[str], Awaitable[None]]
+
+
+def _build_messages(query: str, contexts: list[RetrievedDoc], category: str, tone: str) -> list[dict]:
+    """Prompt for a tone-aware answer grounded in the retrieved context."""
+    context_str = format_contexts(contexts)
+    system_prompt = f"Educational medical assistant. Category: {category}. Tone: {tone}. No prescriptions."
+    
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Context: {context_str}\nQuestion: {query}"}
+    ]
+
+
+async def stream_answer(
     query: str,
-    contexts: list[str],
+    contexts: list[RetrievedDoc],
     category: str,
     tone: str
+) -> AsyncIterator[str]:
+    """
+    Stream an answer using the retrieved context.
+    
+    Args:
+        query: The user's query
+        contexts: Retrieved documents
+        category: The query category (e.g., "Infection Context")
+        tone: The response tone (e.g., "Simplified Educational")
+        
+    Yields:
+        Answer fragments as the LLM produces them (nothing if generation fails)
+    """
+    llm = get_llm_client()
+    # Never cached: a regeneration must not replay the draft it replaces
+    messages = _build_messages(query, contexts, category, tone)
+    async for delta in llm.stream_call(messages, use_cache=False):
+        yield delta
+
+
+async def generate_answer(
+    query: str,
+    contexts: list[RetrievedDoc],
+    category: str,
+    tone: str,
+    on_token: Optional[TokenSink] = None
 ) -> Optional[str]:
     """
     Generate an answer using the retrieved context.
     
     Args:
         query: The user's query
-        contexts: List of retrieved document strings
+        contexts: Retrieved documents
         category: The query category (e.g., "Infection Context")
         tone: The response tone (e.g., "Simplified Educational")
+        on_token: If given, the answer is streamed and each fragment is passed here
         
     Returns:
         Generated answer string or None if generation fails
     """
-    llm = get_llm_client()
-    
-    context_str = "\n".join(contexts)
-    system_prompt = f"Educational medical assistant. Category: {category}. Tone: {tone}. No prescriptions."
+    if on_token is None:
+        llm = get_llm_client()
+        return await llm.call(_build_messages(query, contexts, category, tone), use_cache=False)
     
-    response = llm.call([
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": f"Context: {context_str}\nQuestion: {query}"}
-    ])
+    # Forward fragments as they arrive while buffering the full text for the judge
+    parts = []
+    async for delta in stream_answer(query, contexts, category, tone):
+        parts.append(delta)
+        await on_token(delta)
     
-    return response
+    return "".join(parts) or None
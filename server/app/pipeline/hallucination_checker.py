@@ -3,9 +3,10 @@ Phase 8: Hallucination Checker
 Verifies that generated answers are grounded in the source documents.
 """
 from ..core.llm import get_llm_client
+from ..core.vector_store import RetrievedDoc, format_contexts
 
 
-def check_hallucination(answer: str, contexts: list[str]) -> str:
+async def check_hallucination(answer: str, contexts: list[RetrievedDoc]) -> str:
     """
     Check if the answer contains unsupported claims.
     
@@ -18,10 +19,10 @@ def check_hallucination(answer: str, contexts: list[str]) -> str:
     """
     llm = get_llm_client()
     
-    context_str = "\n".join(contexts)
+    context_str = format_contexts(contexts)
     prompt = f"Context: {context_str}\nAnswer: {answer}\nUnsupported claims? Output YES or NO."
     
-    response = llm.call([{"role": "user", "content": prompt}])
+    response = await llm.call([{"role": "user", "content": prompt}])
     
     if response and "YES" in response.upper():
         return "YES"
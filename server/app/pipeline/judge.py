@@ -0,0 +1,98 @@
+"""
+Phases 6, 8-9 (fused): Combined Judge
+Grades retrieval, grounding and relevance of a generated answer in a single LLM call.
+"""
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Optional
+from ..config import get_settings
+from ..core.llm import get_llm_client, parse_json_object
+from ..core.llm_cache import make_cache_key
+from ..core.vector_store import RetrievedDoc, format_contexts
+from .retrieval_grader import grade_retrieval
+from .hallucination_checker import check_hallucination
+from .final_checker import check_answer_relevance
+
+
+JUDGE_SYSTEM_PROMPT = """
+You are a judge for a medical RAG system.
+Given the source context, the user's question and a generated answer, decide:
+- "retrieval": "GOOD" if the context contains information relevant to the question, otherwise "BAD"
+- "hallucination": "YES" if the answer makes claims NOT supported by the context, otherwise "NO"
+- "relevant": "YES" if the answer addresses the user's question, otherwise "NO"
+
+Output VALID JSON ONLY:
+{"retrieval": "GOOD" | "BAD", "hallucination": "YES" | "NO", "relevant": "YES" | "NO"}
+"""
+
+
+@dataclass
+class JudgeResult:
+    """Verdicts for one generated answer and the documents behind it."""
+    retrieval: str = "BAD"
+    hallucination: str = "NO"
+    relevant: str = "NO"
+
+
+def _verdict(value, positive: str = "YES", negative: str = "NO") -> str:
+    """Normalize a model verdict to positive/negative."""
+    return positive if str(value).strip().upper().startswith(positive) else negative
+
+
+async def combined_judge(
+    query: str,
+    contexts: list[RetrievedDoc],
+    answer: str,
+    cache: Optional[dict[str, Any]] = None
+) -> JudgeResult:
+    """
+    Run retrieval grading, the hallucination check and the final relevance
+    check as one LLM call.
+    
+    Args:
+        query: The user's original question
+        contexts: Source documents used for generation
+        answer: The generated answer
+        cache: Optional request-scoped cache of verdicts
+    
+    Returns:
+        JudgeResult with "GOOD"/"BAD" and "YES"/"NO" verdicts. If the model's
+        JSON cannot be parsed, the standalone checks are run instead.
+    """
+    key = None
+    if cache is not None:
+        key = make_cache_key(["judge", query, [d.id for d in contexts], answer])
+        if key in cache:
+            return cache[key]
+    
+    settings = get_settings()
+    llm = get_llm_client()
+    
+    context_str = format_contexts(contexts)
+    response = await llm.call([
+        {"role": "system", "content": JUDGE_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context: {context_str}\nQuestion: {query}\nAnswer: {answer}"}
+    ], temperature=0.0, response_format={"type": "json_object"} if settings.llm_json_mode else None)
+    
+    if not response:
+        # Same outcome as every standalone check failing
+        return JudgeResult()
+    
+    data = parse_json_object(response)
+    if data is not None and {"retrieval", "hallucination", "relevant"} <= data.keys():
+        result = JudgeResult(
+            retrieval=_verdict(data["retrieval"], "GOOD", "BAD"),
+            hallucination=_verdict(data["hallucination"]),
+            relevant=_verdict(data["relevant"])
+        )
+    else:
+        retrieval, hallucination, relevant = await asyncio.gather(
+            grade_retrieval(query, contexts, cache),
+            check_hallucination(answer, contexts),
+            check_answer_relevance(answer, query)
+        )
+        result = JudgeResult(retrieval=retrieval, hallucination=hallucination, relevant=relevant)
+    
+    if key is not None:
+        cache[key] = result
+    return result
@@ -2,34 +2,113 @@
 Phase 10: Orchestrator Loop (Main Pipeline)
 Coordinates all phases of the Adaptive RAG system with retry logic.
 """
+import asyncio
 import traceback
-from typing import Optional
-from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+from dataclasses import asdict, dataclass, field
 from ..config import get_settings
+from ..core.reranker import get_reranker
 from .query_analyzer import analyze_query
 from .relevance_checker import check_relevance
 from .safety_validator import validate_rewrite, decide_query_strategy
 from .retriever import retrieve_documents, is_kb_covering
-from .retrieval_grader import grade_retrieval
+from .retrieval_grader import rerank_contexts, grade_scores
 from .generator import generate_answer
-from .hallucination_checker import check_hallucination
 from .final_checker import check_answer_relevance
+from .judge import combined_judge
 from .fallback_agent import generate_fallback_response
 
 
-@dataclass
+# Receives (event_name, payload) progress events, e.g. for a streaming response
+EventSink = Callable[[str, dict], Awaitable[None]]
+
+# Most common reason a cycle fails, also what a speculative cycle starts from
+KB_WEAK_MATCH_FEEDBACK = "Knowledge Base has no strong match for this specific medical subdomain."
+
+# Pipeline log entry as (event_name, fields), rendered to text only when a response is built
+LogEvent = tuple[str, dict]
+
+LOG_TEMPLATES = {
+    "cycle_start": "\n--- 🔄 Cycle {n} ---",
+    "llm_unavailable": "❌ LLM Service Unavailable (Rate Limit or Error).",
+    "irrelevant": "Irrelevant: {reason}",
+    "irrelevant_retry": "⚠️ Re-evaluated as locally irrelevant. Continuing retry loop...",
+    "category": "Category: {category}",
+    "tone": "Tone: {tone}",
+    "strategy": "Strategy: {note}",
+    "final_query": "Final Query: {query}",
+    "kb_weak_match": "⚠️ KB Coverage Failure (Weak Match). Retrying...",
+    "retrieval_bad": "⚠️ Retrieval BAD. Retrying...",
+    "hallucination": "⚠️ Hallucination detected. Regenerating...",
+    "answer_irrelevant": "⚠️ Answer not relevant. Retrying...",
+    "success": "✅ Success.",
+    "retries_exhausted": "\n⚠️ Max retries exhausted. Retrieving Fallback...",
+    "fallback_generated": "✅ Fallback Generated.",
+    "traceback": "{line}",
+}
+
+
+def render_logs(events: list[LogEvent]) -> list[str]:
+    """
+    Format structured log events as the display lines sent to clients.
+    
+    Args:
+        events: Log events in pipeline order
+        
+    Returns:
+        One string per event
+    """
+    return [LOG_TEMPLATES[name].format(**fields) for name, fields in events]
+
+
+@dataclass(slots=True)
+class StepTrace:
+    """One pipeline step as shown in the detailed trace."""
+    name: str
+    status: str  # "completed" or "failed"
+    data: dict
+
+
+@dataclass(slots=True)
+class CycleTrace:
+    """Analysis and step records of one retry cycle."""
+    cycle: int
+    analysis: dict
+    steps: list[StepTrace] = field(default_factory=list)
+
+
+@dataclass(slots=True)
 class PipelineResult:
     """Result from the RAG pipeline execution."""
     answer: str
     category: str = "General"
     tone: str = "Simplified Educational"
-    logs: list[str] = field(default_factory=list)
-    detailed_trace: list[dict] = field(default_factory=list)
+    logs: list[LogEvent] = field(default_factory=list)
+    detailed_trace: list[CycleTrace] = field(default_factory=list)
     success: bool = True
     is_fallback: bool = False
+    
+    def rendered_logs(self) -> list[str]:
+        """Log lines as shown to the client."""
+        return render_logs(self.logs)
+    
+    def rendered_trace(self) -> list[dict]:
+        """Detailed trace as plain {cycle, analysis, steps: [{name, status, data}]} dicts."""
+        return [asdict(trace) for trace in self.detailed_trace]
+
 
+@dataclass(slots=True)
+class CycleOutcome:
+    """What one retry cycle of the pipeline produced."""
+    attempt: int
+    logs: list[LogEvent] = field(default_factory=list)
+    trace: Optional[CycleTrace] = None
+    recon: Optional[dict] = None
+    result: Optional[PipelineResult] = None  # Set when the cycle ends the pipeline
+    feedback_reason: Optional[str] = None  # Set when another cycle should run
 
-def query_reconstructor_pipeline(
+
+async def query_reconstructor_pipeline(
     user_query: str,
     feedback_reason: Optional[str] = None
 ) -> Optional[dict]:
@@ -46,19 +125,19 @@ def query_reconstructor_pipeline(
     """
     # 1. Analyze
     q_in = f"{user_query} (Fix: {feedback_reason})" if feedback_reason else user_query
-    analysis = analyze_query(q_in)
+    analysis = await analyze_query(q_in)
     
     if not analysis:
         return None
     
-    # 2. Relevance Check
-    is_rel, rel_msg = check_relevance(user_query, analysis)
+    # 2. Relevance Check (embeddings, off the event loop)
+    is_rel, rel_msg = await asyncio.to_thread(check_relevance, user_query, analysis)
     if not is_rel:
-        return {"is_relevant": False, "logs": [f"Irrelevant: {rel_msg}"]}
+        return {"is_relevant": False, "reason": rel_msg}
     
-    # 3. Validate Rewrite
+    # 3. Validate Rewrite (risk level reported by the analysis call)
     rewritten = analysis.get('rewritten_query', user_query)
-    validation = validate_rewrite(user_query, rewritten)
+    validation = validate_rewrite(analysis)
     
     # 4. Decide Strategy
     final_q, note = decide_query_strategy(user_query, rewritten, validation)
@@ -68,16 +147,208 @@ def query_reconstructor_pipeline(
         "final_query": final_q,
         "category": analysis.get('category', 'General'),
         "answer_tone": analysis.get('answer_tone', 'Simplified Educational'),
-        "logs": [
-            f"Category: {analysis.get('category')}",
-            f"Tone: {analysis.get('answer_tone')}",
-            f"Strategy: {note}",
-            f"Final Query: {final_q}"
-        ]
+        "strategy": note
     }
 
 
-def run_adaptive_rag_pipeline(user_query: str) -> PipelineResult:
+async def run_cycle(
+    user_query: str,
+    attempt: int,
+    feedback_reason: Optional[str],
+    ctx_cache: dict[str, Any],
+    on_event: Optional[EventSink] = None,
+    on_covered: Optional[Callable[[], Any]] = None
+) -> CycleOutcome:
+    """
+    Run one retry cycle: reconstruct, retrieve, guard, generate and judge.
+    
+    Args:
+        user_query: The user's question
+        attempt: 1-based cycle number
+        feedback_reason: Why the previous cycle failed, if any
+        ctx_cache: Request-scoped memo shared by all cycles
+        on_event: Optional sink for streaming events
+        on_covered: Called once the retrieved documents pass the KB coverage guard
+        
+    Returns:
+        CycleOutcome with either a final result or the feedback for the next cycle
+    """
+    outcome = CycleOutcome(attempt=attempt)
+    logs = outcome.logs
+    logs.append(("cycle_start", {"n": attempt}))
+    
+    on_token = None
+    if on_event is not None:
+        async def on_token(delta: str) -> None:
+            await on_event("token", {"text": delta})
+    
+    # 1. Reconstruct Query
+    recon = await query_reconstructor_pipeline(user_query, feedback_reason)
+    outcome.recon = recon
+    
+    if recon is None:
+        logs.append(("llm_unavailable", {}))
+        outcome.result = PipelineResult(
+            answer="Unable to process query due to high server load. Please try again in 1 minute.",
+            success=False
+        )
+        return outcome
+    
+    if not recon or not recon.get('is_relevant'):
+        if attempt == 1:
+            logs.append(("irrelevant", {"reason": recon.get('reason')}))
+            outcome.result = PipelineResult(
+                answer="I can only answer relevant questions.",
+                success=False
+            )
+        else:
+            logs.append(("irrelevant_retry", {}))
+            outcome.feedback_reason = feedback_reason
+        return outcome
+    
+    logs.extend([
+        ("category", {"category": recon['category']}),
+        ("tone", {"tone": recon['answer_tone']}),
+        ("strategy", {"note": recon['strategy']}),
+        ("final_query", {"query": recon['final_query']})
+    ])
+    
+    outcome.trace = CycleTrace(cycle=attempt, analysis=recon)
+    steps = outcome.trace.steps
+    
+    # --- PHASE 1-3 LOGGING ---
+    steps.append(StepTrace("Query Analysis", "completed", recon))
+    
+    # 2. Retrieve Documents
+    contexts = await retrieve_documents(recon['final_query'])
+    sources = [ctx.source for ctx in contexts]
+    
+    steps.append(StepTrace("Document Retrieval", "completed", {"count": len(contexts), "sources": sources}))
+    
+    # 3. KB Coverage Guard (local embedding signal, off the event loop)
+    coverage = await asyncio.to_thread(is_kb_covering, recon['final_query'], contexts, ctx_cache)
+    steps.append(StepTrace("KB Coverage Guard", "completed" if coverage else "failed", {"is_covered": coverage}))
+    if not coverage:
+        logs.append(("kb_weak_match", {}))
+        outcome.feedback_reason = KB_WEAK_MATCH_FEEDBACK
+        return outcome
+    
+    if on_covered is not None:
+        on_covered()
+    
+    # 4. Retrieval Grading by the local reranker, which also puts the best documents first
+    retrieval = None
+    if get_reranker().available:
+        # Judged against the query that retrieved them
+        contexts, scores = await rerank_contexts(recon['final_query'], contexts)
+        retrieval = grade_scores(scores)
+        steps.append(StepTrace("Retrieval Grading", "completed" if retrieval == "GOOD" else "failed", {"grade": retrieval, "top_score": scores[0] if scores else None}))
+        if retrieval == "BAD":
+            logs.append(("retrieval_bad", {}))
+            outcome.feedback_reason = "Retrieved documents were irrelevant."
+            return outcome
+    
+    # 5. Generate Answer (without the reranker, retrieval is graded afterwards by the combined judge)
+    if on_event is not None:
+        await on_event("generation_start", {"cycle": attempt})
+    answer = await generate_answer(
+        recon['final_query'],
+        contexts,
+        recon['category'],
+        recon['answer_tone'],
+        on_token=on_token
+    )
+    steps.append(StepTrace("Answer Generation", "completed", {"raw_length": len(answer)}))
+    
+    # 6-8. Hallucination and Final Relevance (and Retrieval Grading) verdicts from one LLM call
+    verdict = await combined_judge(user_query, contexts, answer, ctx_cache)
+    hallucination, final_rel = verdict.hallucination, verdict.relevant
+    judged_retrieval = retrieval is None
+    if judged_retrieval:
+        retrieval = verdict.retrieval
+    if on_event is not None:
+        # Lets a streaming client flag the draft it has already shown
+        await on_event("verdict", {
+            "cycle": attempt,
+            "retrieval": retrieval,
+            "hallucination": hallucination,
+            "relevant": final_rel
+        })
+    
+    if judged_retrieval:
+        steps.append(StepTrace("Retrieval Grading", "completed" if retrieval == "GOOD" else "failed", {"grade": retrieval}))
+        if retrieval == "BAD":
+            logs.append(("retrieval_bad", {}))
+            outcome.feedback_reason = "Retrieved documents were irrelevant."
+            return outcome
+    
+    steps.append(StepTrace("Hallucination Check", "completed", {"is_hallucination": hallucination}))
+    if hallucination == "YES":
+        logs.append(("hallucination", {}))
+        if on_event is not None:
+            await on_event("generation_start", {"cycle": attempt})
+        answer = await generate_answer(
+            recon['final_query'],
+            contexts,
+            recon['category'],
+            recon['answer_tone'],
+            on_token=on_token
+        )
+        # The relevance verdict above was for the discarded answer
+        final_rel = await check_answer_relevance(answer, user_query)
+    
+    steps.append(StepTrace("Final Relevance Check", "completed" if final_rel == "YES" else "failed", {"is_relevant": final_rel}))
+    if final_rel == "NO":
+        logs.append(("answer_irrelevant", {}))
+        outcome.feedback_reason = "Answer missed intent."
+        return outcome
+    
+    logs.append(("success", {}))
+    outcome.result = PipelineResult(
+        answer=answer,
+        category=recon['category'],
+        tone=recon['answer_tone'],
+        success=True
+    )
+    return outcome
+
+
+async def race_cycles(cycles: list[asyncio.Task]) -> list[CycleOutcome]:
+    """
+    Wait for concurrently running cycles, short-circuiting on a decisive one.
+    
+    A successful cycle wins outright and the others are cancelled. The first
+    (non-speculative) cycle also decides the race when it ends the pipeline.
+    
+    Args:
+        cycles: Cycle tasks, the regular one first
+        
+    Returns:
+        Outcomes of the cycles that finished (not cancelled), in attempt order
+    """
+    primary = cycles[0]
+    pending = set(cycles)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                result = task.result().result
+                if result is not None and (result.success or task is primary):
+                    return [task.result()]
+    finally:
+        for task in pending:
+            task.cancel()
+    
+    finished = [task.result() for task in cycles if not task.cancelled()]
+    return sorted(finished, key=lambda outcome: outcome.attempt)
+
+
+async def run_adaptive_rag_pipeline(
+    user_query: str,
+    on_event: Optional[EventSink] = None
+) -> PipelineResult:
     """
     Main orchestrator for the Adaptive RAG pipeline.
     
@@ -93,141 +364,73 @@ def run_adaptive_rag_pipeline(user_query: str) -> PipelineResult:
     9. Final Relevance Check
     10. Orchestration Loop
     
+    Phase 6 is scored before generation by a local cross-encoder reranker
+    (RERANK_ENABLED); phases 8 and 9, and 6 without the reranker, are judged
+    together by one LLM call after generation.
+    With SPECULATIVE_RETRY enabled, the next cycle starts alongside the current
+    one and is cancelled as soon as the current one passes the KB coverage guard.
+    
     Args:
         user_query: The user's question
+        on_event: Optional sink for streaming events. Each answer generation
+            emits "generation_start" followed by its "token" fragments, and
+            each judged draft a "verdict".
         
     Returns:
         PipelineResult with answer, metadata, and logs
     """
     settings = get_settings()
+    # Request-scoped memo of embeddings and LLM verdicts, shared across retry cycles
+    ctx_cache: dict[str, Any] = {}
     
     try:
         max_retries = settings.max_pipeline_retries
         attempt = 0
-        logs = []
-        detailed_trace = []
+        logs: list[LogEvent] = []
+        detailed_trace: list[CycleTrace] = []
         feedback_reason = None
         recon = None
         
         while attempt < max_retries:
             attempt += 1
-            logs.append(f"\n--- 🔄 Cycle {attempt} ---")
             
-            # 1. Reconstruct Query
-            recon = query_reconstructor_pipeline(user_query, feedback_reason)
-            
-            if recon is None:
-                logs.append("❌ LLM Service Unavailable (Rate Limit or Error).")
-                return PipelineResult(
-                    answer="Unable to process query due to high server load. Please try again in 1 minute.",
-                    logs=logs,
-                    success=False
+            cycles = []
+            on_covered = None
+            if settings.speculative_retry and attempt < max_retries:
+                # Runs silently (no streamed tokens) from the most common failure feedback
+                speculative = asyncio.create_task(
+                    run_cycle(user_query, attempt + 1, KB_WEAK_MATCH_FEEDBACK, ctx_cache)
                 )
+                cycles.append(speculative)
+                on_covered = speculative.cancel
+            cycles.insert(0, asyncio.create_task(
+                run_cycle(user_query, attempt, feedback_reason, ctx_cache, on_event, on_covered)
+            ))
             
-            if not recon or not recon.get('is_relevant'):
-                if attempt == 1:
-                    logs.extend(recon.get('logs', []))
-                    return PipelineResult(
-                        answer="I can only answer relevant questions.",
-                        logs=logs,
-                        success=False
-                    )
-                else:
-                    logs.append("⚠️ Re-evaluated as locally irrelevant. Continuing retry loop...")
-                    continue
-            
-            logs.extend(recon['logs'])
-            
-            trace_data = {
-                "cycle": attempt,
-                "analysis": recon,
-                "steps": []
-            }
-            
-            # --- PHASE 1-3 LOGGING ---
-            trace_data["steps"].append({"name": "Query Analysis", "status": "completed", "data": recon})
-            
-            # 2. Retrieve Documents
-            contexts = retrieve_documents(recon['final_query'])
-            # Extract names from formatted strings (Source: name\nContent: ...)
-            sources = []
-            for ctx in contexts:
-                if "Source: " in ctx:
-                    sources.append(ctx.split("\n")[0].replace("Source: ", ""))
-                else:
-                    sources.append("Unknown")
-            
-            trace_data["steps"].append({"name": "Document Retrieval", "status": "completed", "data": {"count": len(contexts), "sources": sources}})
-            
-            # 3. KB Coverage Guard
-            coverage = is_kb_covering(recon['final_query'], contexts)
-            trace_data["steps"].append({"name": "KB Coverage Guard", "status": "completed" if coverage else "failed", "data": {"is_covered": coverage}})
-            if not coverage:
-                logs.append("⚠️ KB Coverage Failure (Weak Match). Retrying...")
-                feedback_reason = "Knowledge Base has no strong match for this specific medical subdomain."
-                detailed_trace.append(trace_data)
-                continue
-            
-            # 4. Grade Retrieval
-            grade = grade_retrieval(recon['final_query'], contexts)
-            trace_data["steps"].append({"name": "Retrieval Grading", "status": "completed" if grade == "GOOD" else "failed", "data": {"grade": grade}})
-            if grade == "BAD":
-                logs.append("⚠️ Retrieval BAD. Retrying...")
-                feedback_reason = "Retrieved documents were irrelevant."
-                detailed_trace.append(trace_data)
-                continue
-            
-            # 5. Generate Answer
-            answer = generate_answer(
-                recon['final_query'],
-                contexts,
-                recon['category'],
-                recon['answer_tone']
-            )
-            trace_data["steps"].append({"name": "Answer Generation", "status": "completed", "data": {"raw_length": len(answer)}})
-            
-            # 6. Check Hallucination
-            hallucination = check_hallucination(answer, contexts)
-            trace_data["steps"].append({"name": "Hallucination Check", "status": "completed", "data": {"is_hallucination": hallucination}})
-            if hallucination == "YES":
-                logs.append("⚠️ Hallucination detected. Regenerating...")
-                answer = generate_answer(
-                    recon['final_query'],
-                    contexts,
-                    recon['category'],
-                    recon['answer_tone']
-                )
-            
-            # 7. Check Final Relevance
-            final_rel = check_answer_relevance(answer, user_query)
-            trace_data["steps"].append({"name": "Final Relevance Check", "status": "completed" if final_rel == "YES" else "failed", "data": {"is_relevant": final_rel}})
-            if final_rel == "NO":
-                logs.append("⚠️ Answer not relevant. Retrying...")
-                feedback_reason = "Answer missed intent."
-                detailed_trace.append(trace_data)
-                continue
-            
-            logs.append("✅ Success.")
-            detailed_trace.append(trace_data)
-            return PipelineResult(
-                answer=answer,
-                category=recon['category'],
-                tone=recon['answer_tone'],
-                logs=logs,
-                detailed_trace=detailed_trace,
-                success=True
-            )
+            for outcome in await race_cycles(cycles):
+                attempt = outcome.attempt
+                recon = outcome.recon
+                logs.extend(outcome.logs)
+                if outcome.trace is not None:
+                    detailed_trace.append(outcome.trace)
+                
+                if outcome.result is not None:
+                    result = outcome.result
+                    result.logs = logs
+                    result.detailed_trace = detailed_trace
+                    return result
+                feedback_reason = outcome.feedback_reason
         
         # Max retries exhausted - use fallback
-        logs.append("\n⚠️ Max retries exhausted. Retrieving Fallback...")
+        logs.append(("retries_exhausted", {}))
         
         current_category = recon.get('category', 'General') if recon else 'General'
         current_tone = recon.get('answer_tone', 'Simplified Educational') if recon else 'Simplified Educational'
         
-        fallback_ans = generate_fallback_response(user_query, current_category, current_tone)
+        fallback_ans = await generate_fallback_response(user_query, current_category, current_tone)
         
         if fallback_ans:
-            logs.append("✅ Fallback Generated.")
+            logs.append(("fallback_generated", {}))
             return PipelineResult(
                 answer=fallback_ans,
                 category=current_category,
@@ -248,6 +451,6 @@ def run_adaptive_rag_pipeline(user_query: str) -> PipelineResult:
         tb = traceback.format_exc().splitlines()
         return PipelineResult(
             answer=err_msg,
-            logs=tb,
+            logs=[("traceback", {"line": line}) for line in tb],
             success=False
         )
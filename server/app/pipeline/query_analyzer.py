@@ -2,9 +2,9 @@
 Phase 1: Query Analysis & Restructuring Agent
 Analyzes user queries to understand intent, category, tone, and rewrites for better retrieval.
 """
-import json
 from typing import Optional
-from ..core.llm import get_llm_client
+from ..core.llm import get_llm_client, parse_json_object
+from ..core.llm_cache import cached
 
 
 ANALYSIS_SYSTEM_PROMPT = """
@@ -12,6 +12,8 @@ You are a query analysis and restructuring engine for an Adaptive RAG system.
 CRITICAL RULES:
 - Query rewriting MUST be LOSSLESS.
 - Do NOT add entities, tools, datasets, years, domains, or assumptions.
+- Self-check the rewrite: set "rewrite_risk_level" to "low" only if it adds no entities,
+  changes no constraints and introduces nothing absent from the original; otherwise "medium" or "high".
 - Output VALID JSON ONLY.
 
 REQUIRED JSON OUTPUT CONTRACT:
@@ -21,12 +23,16 @@ REQUIRED JSON OUTPUT CONTRACT:
   "answer_tone": "<Simplified Educational|Structured Clinical>",
   "original_query": "...",
   "rewritten_query": "...",
-  "rewrite_rationale": "..."
+  "rewrite_rationale": "...",
+  "rewrite_risk_level": "<low|medium|high>"
 }
 """
 
 
-def analyze_query(user_query: str) -> Optional[dict]:
+# Only complete analyses are kept; the parse-failure defaults below lack the
+# rewrite self-check and are retried on the next call
+@cached(cache_if=lambda analysis: analysis is not None and "rewrite_risk_level" in analysis)
+async def analyze_query(user_query: str) -> Optional[dict]:
     """
     Analyze and restructure the user query for optimal retrieval.
     
@@ -39,18 +45,17 @@ def analyze_query(user_query: str) -> Optional[dict]:
     """
     llm = get_llm_client()
     
-    response = llm.call([
+    # The parsed analysis is memoized above, so skip the raw response cache
+    response = await llm.call([
         {"role": "system", "content": ANALYSIS_SYSTEM_PROMPT},
         {"role": "user", "content": f"Query: {user_query}"}
-    ], temperature=0.1)
+    ], temperature=0.1, use_cache=False)
     
     if not response:
         return None
         
-    try:
-        clean_resp = response.replace('```json', '').replace('```', '')
-        return json.loads(clean_resp)
-    except json.JSONDecodeError:
+    analysis = parse_json_object(response)
+    if analysis is None:
         # Return safe defaults if JSON parsing fails
         return {
             "is_relevant": True,
@@ -59,3 +64,5 @@ def analyze_query(user_query: str) -> Optional[dict]:
             "original_query": user_query,
             "rewritten_query": user_query
         }
+    
+    return analysis
@@ -1,28 +1,149 @@
 """
 Phase 6: Retrieval Grader
 Evaluates if retrieved documents are actually useful for answering the query.
+Scored locally by a cross-encoder reranker, with an LLM grader as fallback.
 """
+import asyncio
+import re
+import json
+from typing import Any, Optional
+from ..config import get_settings
 from ..core.llm import get_llm_client
+from ..core.llm_cache import cached, make_cache_key
+from ..core.reranker import get_reranker
+from ..core.vector_store import RetrievedDoc
 
 
-def grade_retrieval(query: str, contexts: list[str]) -> str:
+GRADING_SYSTEM_PROMPT = """
+You are a retrieval grader for a medical RAG system.
+For EACH numbered context, decide whether it is relevant to the query.
+Output one JSON object per context, one per line, in order, and nothing else:
+{"i": 0, "relevant": true}
+{"i": 1, "relevant": false}
+"""
+
+# One flat {...} object per verdict line
+_VERDICT_RE = re.compile(r'\{[^{}]*\}')
+
+
+def _parse_grades(response: str, count: int) -> list[bool]:
     """
-    Grade the quality of retrieved documents.
+    Align the model's per-context verdicts with the input order.
+    
+    Contexts without a parseable verdict are kept (graded relevant).
+    """
+    grades: list[Optional[bool]] = [None] * count
+    
+    for match in _VERDICT_RE.finditer(response):
+        try:
+            item = json.loads(match.group(0))
+        except json.JSONDecodeError:
+            continue
+        i = item.get("i")
+        relevant = item.get("relevant")
+        if isinstance(i, int) and 0 <= i < count and isinstance(relevant, bool):
+            grades[i] = relevant
+    
+    return [True if g is None else g for g in grades]
+
+
+async def grade_batch(
+    query: str,
+    contexts: list[RetrievedDoc],
+    cache: Optional[dict[str, Any]] = None
+) -> list[bool]:
+    """
+    Grade every retrieved document in a single LLM call.
     
     Args:
         query: The user's query
-        contexts: List of retrieved document strings
+        contexts: Retrieved documents
+        cache: Optional request-scoped cache; a retry that grades the same
+            query and documents again reuses the earlier verdicts
         
     Returns:
-        "GOOD" if documents are relevant, "BAD" otherwise
+        List of relevance flags aligned with contexts
     """
+    if not contexts:
+        return []
+    
+    key = None
+    if cache is not None:
+        key = make_cache_key(["grade", query, [d.id for d in contexts]])
+        if key in cache:
+            return cache[key]
+    
     llm = get_llm_client()
     
-    context_str = "\n".join(contexts)
-    prompt = f"Query: {query}\nContext: {context_str}\nRelevant? Output GOOD or BAD."
+    numbered = "\n\n".join(
+        f"[{i}] Source: {d.source}\nContent: {d.content}" for i, d in enumerate(contexts)
+    )
+    response = await llm.call([
+        {"role": "system", "content": GRADING_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Query: {query}\n\nContexts:\n{numbered}"}
+    ], temperature=0.0)
     
-    response = llm.call([{"role": "user", "content": prompt}])
+    if not response:
+        return [False] * len(contexts)
     
-    if response and "GOOD" in response.upper():
+    grades = _parse_grades(response, len(contexts))
+    if key is not None:
+        cache[key] = grades
+    return grades
+
+
+async def rerank_contexts(
+    query: str,
+    contexts: list[RetrievedDoc]
+) -> tuple[list[RetrievedDoc], list[float]]:
+    """
+    Order documents by local cross-encoder relevance (off the event loop).
+    
+    Args:
+        query: The user's query
+        contexts: Retrieved documents
+        
+    Returns:
+        (documents, scores), best match first
+    """
+    scores = await asyncio.to_thread(get_reranker().score, query, [d.content for d in contexts])
+    ranked = sorted(zip(contexts, scores.tolist()), key=lambda pair: pair[1], reverse=True)
+    return [doc for doc, _ in ranked], [score for _, score in ranked]
+
+
+def grade_scores(scores: list[float]) -> str:
+    """Grade reranker scores: "GOOD" if the best one clears rerank_threshold, else "BAD"."""
+    if scores and max(scores) >= get_settings().rerank_threshold:
         return "GOOD"
     return "BAD"
+
+
+# Keyed on the query and document ids; "BAD" is also what a failed LLM call yields
+@cached(
+    key=lambda query, contexts, cache=None: [query, [d.id for d in contexts]],
+    cache_if=lambda grade: grade == "GOOD"
+)
+async def grade_retrieval(
+    query: str,
+    contexts: list[RetrievedDoc],
+    cache: Optional[dict[str, Any]] = None
+) -> str:
+    """
+    Grade the quality of retrieved documents.
+    
+    Uses the local cross-encoder when it is loaded, otherwise one LLM call.
+    
+    Args:
+        query: The user's query
+        contexts: Retrieved documents
+        cache: Optional request-scoped cache (see grade_batch)
+        
+    Returns:
+        "GOOD" if any document is relevant, "BAD" otherwise
+    """
+    if get_reranker().available:
+        _, scores = await rerank_contexts(query, contexts)
+        return grade_scores(scores)
+    
+    grades = await grade_batch(query, contexts, cache)
+    return "GOOD" if any(grades) else "BAD"
@@ -2,12 +2,17 @@
 Phase 5: Retriever using FAISS Vector Search
 Also includes KB Coverage Guard (Phase 5b).
 """
-from ..core.vector_store import get_vector_store
+import logging
+from typing import Any, Optional
+from ..core.llm_cache import make_cache_key
+from ..core.vector_store import RetrievedDoc, get_vector_store
 from ..core.embeddings import get_embedding_service
 from ..config import get_settings
 
+logger = logging.getLogger(__name__)
 
-def retrieve_documents(query_text: str, k: int | None = None) -> list[str]:
+
+async def retrieve_documents(query_text: str, k: int | None = None) -> list[RetrievedDoc]:
     """
     Retrieve relevant documents from the vector store.
     
@@ -16,22 +21,33 @@ def retrieve_documents(query_text: str, k: int | None = None) -> list[str]:
         k: Number of documents to retrieve
         
     Returns:
-        List of formatted document strings
+        List of retrieved documents
     """
     vector_store = get_vector_store()
-    return vector_store.search(query_text, k)
+    docs = await vector_store.search(query_text, k)
+    # Building the source list is wasted work unless DEBUG is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Retrieved %d docs: %s", len(docs), [doc.source for doc in docs])
+    return docs
 
 
-def is_kb_covering(query_text: str, retrieved_contexts: list[str]) -> bool:
+def is_kb_covering(
+    query_text: str,
+    retrieved_contexts: list[RetrievedDoc],
+    cache: Optional[dict[str, Any]] = None
+) -> bool:
     """
     KB Coverage Guard - Check if retrieved documents actually match the query.
     
     Uses semantic similarity to verify that at least one retrieved document
-    has sufficient relevance to the query (above threshold).
+    has sufficient relevance to the query (above threshold). Scores computed
+    by the vector search are used as-is when the index's distances are exact;
+    with quantized indexes (no scores) the documents are re-embedded.
     
     Args:
         query_text: The user's query
-        retrieved_contexts: List of retrieved document strings
+        retrieved_contexts: Retrieved documents
+        cache: Optional request-scoped cache holding the query embedding
         
     Returns:
         True if KB has adequate coverage, False otherwise
@@ -42,29 +58,30 @@ def is_kb_covering(query_text: str, retrieved_contexts: list[str]) -> bool:
     settings = get_settings()
     embedding_service = get_embedding_service()
     
-    valid_contexts = [c for c in retrieved_contexts if "[ERROR]" not in c]
+    valid_contexts = [c for c in retrieved_contexts if c.content]
     if not valid_contexts:
         return False
+    
+    # Exact search-time cosine scores already answer the question, no encoding needed
+    if all(c.score is not None for c in valid_contexts):
+        return max(c.score for c in valid_contexts) >= settings.kb_coverage_threshold
         
     try:
-        q_vec = embedding_service.encode(query_text)
-        max_score = -1.0
+        # The query is encoded once per request, however many cycles check it
+        cache = {} if cache is None else cache
+        q_key = make_cache_key(["q_vec", query_text])
+        if q_key not in cache:
+            cache[q_key] = embedding_service.encode(query_text)
+        q_vec = cache[q_key]
         
-        for ctx in valid_contexts:
-            # Extract content after "Content: " marker if present
-            parts = ctx.split("Content: ", 1)
-            content = parts[1] if len(parts) > 1 else ctx
-            
-            # Limit length for speed
-            c_vec = embedding_service.encode(content[:1000])
-            score = embedding_service.calculate_similarity(query_text, content[:1000])
-            
-            if score > max_score:
-                max_score = score
+        # One forward pass over all contexts (truncated for speed); unit vectors,
+        # so the matrix-vector product gives every cosine at once
+        ctx_vecs = embedding_service.encode_batch([c.content[:1000] for c in valid_contexts])
+        max_score = float((ctx_vecs @ q_vec).max())
                 
         return max_score >= settings.kb_coverage_threshold
         
     except Exception as e:
-        print(f"Coverage check error: {e}")
+        logger.warning("Coverage check error: %s", e)
         # Fail open to avoid blocking valid flows
         return True
@@ -1,44 +1,28 @@
 """
 Phase 3: Safety Validator (Rewrite Checker)
-Validates that query rewrites don't introduce hallucinations or change meaning.
+Validates that query rewrites don't introduce hallucinations or change meaning,
+using the risk level the analyzer reports for its own rewrite.
 """
-import json
-from ..core.llm import get_llm_client
 
 
-VALIDATION_SYSTEM_PROMPT = """
-You are a query rewrite validator.
-Check for ADDED entities, CHANGED constraints, or HALLUCINATIONS.
-Output JSON: { "risk_level": "low" | "medium" | "high" }
-"""
+RISK_LEVELS = ("low", "medium", "high")
 
 
-def validate_rewrite(original: str, rewritten: str) -> dict:
+def validate_rewrite(analysis: dict) -> dict:
     """
-    Validate that the rewritten query preserves the original meaning.
+    Read the analyzer's self-assessment of its rewrite.
+    
+    The analysis prompt grades its own rewrite, which saves a separate
+    validation LLM call.
     
     Args:
-        original: Original user query
-        rewritten: LLM's rewritten version
+        analysis: Output from query analyzer
         
     Returns:
-        Dict with 'risk_level': 'low', 'medium', or 'high'
+        Dict with 'risk_level': 'low', 'medium', or 'high' (high when missing)
     """
-    llm = get_llm_client()
-    
-    response = llm.call([
-        {"role": "system", "content": VALIDATION_SYSTEM_PROMPT},
-        {"role": "user", "content": f"Original: {original}\nRewritten: {rewritten}"}
-    ], temperature=0.0)
-    
-    if not response:
-        return {"risk_level": "high"}
-        
-    try:
-        clean_resp = response.replace('```json', '').replace('```', '')
-        return json.loads(clean_resp)
-    except json.JSONDecodeError:
-        return {"risk_level": "high"}
+    risk = str(analysis.get("rewrite_risk_level", "high")).strip().lower()
+    return {"risk_level": risk if risk in RISK_LEVELS else "high"}
 
 
 def decide_query_strategy(
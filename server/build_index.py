@@ -0,0 +1,101 @@
+"""
+Rebuild the FAISS index of an existing vector store as an ANN index.
+
+Reads the vectors back out of the flat copy (index_flat.faiss) written by
+index_docs.py, or out of a legacy flat index.faiss,
+L2-normalizes them so inner product equals cosine similarity, and writes
+an HNSW (small corpora) or IVF (large corpora) index over 8-bit scalar
+quantized codes (SQ8, one byte per dimension) in its place. With --rescore
+the fp32 vectors are kept alongside and used to re-rank the candidates.
+Row ids are preserved, so the document store stays valid.
+"""
+import os
+import sys
+import shutil
+import logging
+import argparse
+import math
+import numpy as np
+import faiss
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+VECTOR_DIR = './vector_store'
+INDEX_FILE = 'index.faiss'
+FLAT_BACKUP_FILE = 'index_flat.faiss'
+HNSW_MAX_VECTORS = 50_000
+
+
+def default_factory(n_vectors, dimension):
+    """Pick an index layout for the corpus size."""
+    if n_vectors < HNSW_MAX_VECTORS:
+        return "HNSW32,SQ8"
+    nlist = int(4 * math.sqrt(n_vectors))
+    return f"IVF{nlist},SQ8"
+
+
+def load_vectors(vector_dir):
+    """Load the original (exhaustive) index and reconstruct its vectors."""
+    backup_path = os.path.join(vector_dir, FLAT_BACKUP_FILE)
+    index_path = os.path.join(vector_dir, INDEX_FILE)
+
+    # Re-running the script starts from the untouched flat index
+    source_path = backup_path if os.path.exists(backup_path) else index_path
+    flat = faiss.read_index(source_path)
+    logger.info(f"Loaded {source_path} ({flat.ntotal} vectors, d={flat.d})")
+
+    vectors = flat.reconstruct_n(0, flat.ntotal).astype(np.float32)
+    return source_path, vectors
+
+
+def build_index(vectors, factory):
+    """Train and fill an inner-product index on normalized vectors."""
+    faiss.normalize_L2(vectors)
+    index = faiss.index_factory(vectors.shape[1], factory, faiss.METRIC_INNER_PRODUCT)
+
+    if not index.is_trained:
+        logger.info(f"Training {factory} on {len(vectors)} vectors...")
+        index.train(vectors)
+
+    index.add(vectors)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--vector-dir', default=VECTOR_DIR)
+    parser.add_argument('--factory', default=None,
+                        help='faiss.index_factory string, e.g. "SQ8", "IVF256,SQ8" or "IVF256,PQ48"')
+    parser.add_argument('--rescore', action='store_true',
+                        help='keep fp32 vectors and re-rank quantized candidates with them (RFlat)')
+    args = parser.parse_args()
+
+    index_path = os.path.join(args.vector_dir, INDEX_FILE)
+    if not os.path.exists(index_path):
+        logger.error(f"❌ No index found at {index_path}. Run index_docs.py first.")
+        sys.exit(1)
+
+    faiss.omp_set_num_threads(os.cpu_count() or 1)
+
+    source_path, vectors = load_vectors(args.vector_dir)
+    factory = args.factory or default_factory(*vectors.shape)
+    if args.rescore:
+        factory += ",RFlat"
+
+    index = build_index(vectors, factory)
+    logger.info(f"✅ Built {factory} index. Total vectors: {index.ntotal}")
+
+    # Keep the exhaustive index around for rebuilds
+    backup_path = os.path.join(args.vector_dir, FLAT_BACKUP_FILE)
+    if source_path == index_path:
+        shutil.copyfile(index_path, backup_path)
+
+    faiss.write_index(index, index_path)
+    logger.info(f"✅ Saved {index_path} (flat original kept as {backup_path})")
+
+
+if __name__ == "__main__":
+    main()
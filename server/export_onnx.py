@@ -0,0 +1,48 @@
+"""
+Export the embedding model to ONNX and quantize it to int8 for CPU inference.
+
+Writes model.onnx, model_int8.onnx and the tokenizer files to OUTPUT_DIR.
+Enable it in the server with EMBEDDING_BACKEND=onnx.
+"""
+import os
+import sys
+import logging
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# --- CONFIGURATION ---
+MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+OUTPUT_DIR = './onnx/all-MiniLM-L6-v2'
+
+
+def export(model_name, output_dir):
+    try:
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        from transformers import AutoTokenizer
+    except ImportError as e:
+        logger.error(f"❌ Missing export dependency ({e}). Run: pip install optimum[onnxruntime]")
+        sys.exit(1)
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    logger.info(f"Exporting {model_name} to ONNX...")
+    model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(output_dir)
+
+    fp32_path = os.path.join(output_dir, 'model.onnx')
+    int8_path = os.path.join(output_dir, 'model_int8.onnx')
+    logger.info("Quantizing weights to int8...")
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+
+    logger.info(f"✅ Saved {int8_path}")
+
+
+if __name__ == "__main__":
+    export(
+        sys.argv[1] if len(sys.argv) > 1 else MODEL_NAME,
+        sys.argv[2] if len(sys.argv) > 2 else OUTPUT_DIR
+    )
@@ -2,18 +2,21 @@ import os
 import shutil
 import logging
 import sys
+import math
 import re
 import unicodedata
-import pickle
 import json
 import numpy as np
-import faiss
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from pdf2image import convert_from_path
 import pytesseract
 from PIL import Image
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
+from app.config import get_settings
+from app.core.doc_store import DOC_STORE_FILE, write_doc_store
+# torch and faiss are imported where they are used: spawned OCR workers
+# re-import this module and must stay light
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,9 +27,19 @@ INPUT_DIR = '../vector_storage/raw_documents'
 # If raw_documents doesn't exist in vector_storage, check Documents
 ALT_INPUT_DIR = '../vector_storage/Documents'
 OUTPUT_DIR = './vector_store'
-MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+ENCODE_BATCH_SIZE = 256
 CHUNK_SIZE = 400
 CHUNK_OVERLAP = 80
+MIN_CHUNK_LENGTH = 50
+POPPLER_BIN = r'C:\Users\Dell\anaconda3\envs\venv\Library\bin'
+# LSTM engine only, single uniform block of text
+TESSERACT_CONFIG = '--oem 1 --psm 6'
+OCR_WORKERS = os.cpu_count() or 1
+# HNSW up to this many chunks, IVF-PQ beyond
+HNSW_MAX_VECTORS = 50_000
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+ADD_BATCH_SIZE = 10_000
 
 def setup_tesseract():
     try:
@@ -57,14 +70,47 @@ def setup_tesseract():
         logger.error(f"❌ Tesseract OCR setup failed: {e}")
         sys.exit(1)
 
+_WS_RE = re.compile(r'\s+')
+# "page N" and "page N of M" footers in one pass
+_PAGE_RE = re.compile(r'page \d+(?: of \d+)?')
+
+def init_ocr_worker(tesseract_cmd):
+    # Spawned workers don't inherit the path found by setup_tesseract()
+    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+def ocr_page(image):
+    return pytesseract.image_to_string(image, config=TESSERACT_CONFIG)
+
 def normalize_text(text):
     text = unicodedata.normalize('NFKD', text)
     text = text.lower()
-    text = re.sub(r'\s+', ' ', text).strip()
-    text = re.sub(r'page \d+ of \d+', '', text)
-    text = re.sub(r'page \d+', '', text)
+    text = _WS_RE.sub(' ', text).strip()
+    text = _PAGE_RE.sub('', text)
     return text
 
+def load_encoder():
+    """
+    Load the same encoder the server uses (EMBEDDING_BACKEND / EMBEDDING_MODEL_NAME),
+    so document and query vectors come from one model. PyTorch runs in fp16 on GPU.
+    """
+    settings = get_settings()
+    if settings.embedding_backend == "onnx":
+        try:
+            from app.core.onnx_encoder import OnnxSentenceEncoder
+            encoder = OnnxSentenceEncoder(settings.embedding_onnx_dir, model_file=settings.embedding_onnx_file)
+            logger.info(f"⚡ Using int8 ONNX encoder from {settings.embedding_onnx_dir}")
+            return encoder
+        except Exception as e:
+            logger.warning(f"⚠️ ONNX encoder unavailable ({e}). Falling back to PyTorch.")
+
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Loading model: {settings.embedding_model_name}...")
+    model = SentenceTransformer(settings.embedding_model_name)
+    if model.device.type == 'cuda':
+        model.half()
+    return model
+
 def run_indexing():
     # 1. Setup environment
     if os.path.exists(OUTPUT_DIR):
@@ -93,82 +139,100 @@ def run_indexing():
 
     logger.info(f"Processing {len(source_files)} documents...")
 
-    # 3. OCR Extraction
+    # 3. OCR Extraction (Tesseract is single-threaded, so pages are spread over processes)
     documents = []
-    for doc_idx, filename in enumerate(source_files):
-        logger.info(f"📄 Processing {filename} ({doc_idx+1}/{len(source_files)})...")
-        full_text = ""
-        file_ext = filename.split('.')[-1].lower()
-        
-        try:
-            if file_ext == 'pdf':
-                poppler_bin = r'C:\Users\Dell\anaconda3\envs\venv\Library\bin'
-                images = convert_from_path(filename, poppler_path=poppler_bin)
-                for image in images:
-                    full_text += pytesseract.image_to_string(image) + "\n"
-            else:
-                full_text += pytesseract.image_to_string(Image.open(filename))
+    with ProcessPoolExecutor(
+        max_workers=OCR_WORKERS,
+        initializer=init_ocr_worker,
+        initargs=(pytesseract.pytesseract.tesseract_cmd,)
+    ) as ocr_pool:
+        for doc_idx, filename in enumerate(source_files):
+            logger.info(f"📄 Processing {filename} ({doc_idx+1}/{len(source_files)})...")
+            full_text = ""
+            file_ext = filename.split('.')[-1].lower()
             
-            documents.append({"doc_id": doc_idx, "source": filename, "raw_text": full_text})
-            logger.info(f"   ✅ Extracted {len(full_text)} characters.")
-        except Exception as e:
-            logger.error(f"   ❌ Error processing {filename}: {e}")
+            try:
+                if file_ext == 'pdf':
+                    images = convert_from_path(filename, poppler_path=POPPLER_BIN, thread_count=OCR_WORKERS)
+                    full_text = "".join(page + "\n" for page in ocr_pool.map(ocr_page, images))
+                else:
+                    full_text = ocr_page(Image.open(filename))
+                
+                documents.append({"doc_id": doc_idx, "source": filename, "raw_text": full_text})
+                logger.info(f"   ✅ Extracted {len(full_text)} characters.")
+            except Exception as e:
+                logger.error(f"   ❌ Error processing {filename}: {e}")
 
     # 4. Cleaning & Chunking
     chunks = []
-    chunk_counter = 0
     for doc in documents:
         clean_text = normalize_text(doc['raw_text'])
-        for i in range(0, len(clean_text), CHUNK_SIZE - CHUNK_OVERLAP):
-            chunk_text = clean_text[i : i + CHUNK_SIZE]
-            if len(chunk_text) < 50: continue
-            
-            chunks.append({
-                "chunk_id": chunk_counter,
+        source = os.path.basename(doc['source'])
+        # Only the tail chunks can be short, so filter on start offset instead of slicing first
+        starts = range(0, len(clean_text) - MIN_CHUNK_LENGTH + 1, CHUNK_SIZE - CHUNK_OVERLAP)
+        first_id = len(chunks)
+        chunks += [
+            {
+                "chunk_id": first_id + n,
                 "doc_id": doc['doc_id'],
-                "text": chunk_text,
-                "source": os.path.basename(doc['source']),
+                "text": clean_text[i : i + CHUNK_SIZE],
+                "source": source,
                 "position": i
-            })
-            chunk_counter += 1
+            }
+            for n, i in enumerate(starts)
+        ]
 
     logger.info(f"✅ Generated {len(chunks)} chunks.")
 
     # 5. Embeddings
-    logger.info(f"Loading model: {MODEL_NAME}...")
-    model = SentenceTransformer(MODEL_NAME)
+    model = load_encoder()
     
     texts = [c['text'] for c in chunks]
     logger.info(f"Encoding {len(texts)} chunks...")
-    embeddings = model.encode(texts, show_progress_bar=True, convert_to_numpy=True)
+    embeddings = model.encode(
+        texts,
+        batch_size=ENCODE_BATCH_SIZE,
+        show_progress_bar=True,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
     embeddings = embeddings.astype(np.float32)
 
-    # 6. Build FAISS Index
+    # 6. Build FAISS Index (encode() already returned unit vectors, so inner product == cosine)
+    import faiss
+    faiss.omp_set_num_threads(os.cpu_count() or 1)
     dimension = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dimension)
-    index.add(embeddings)
-    logger.info(f"✅ FAISS Index created. Total vectors: {index.ntotal}")
-
-    # 7. Metadata Store
-    metadata_store = {}
-    text_store = {}
-    for i, chunk in enumerate(chunks):
-        c_id = chunk['chunk_id']
-        metadata_store[c_id] = { 
-            "doc_id": chunk['doc_id'], 
-            "source": chunk['source'], 
-            "position": chunk['position'] 
-        }
-        text_store[c_id] = chunk['text']
+    if len(embeddings) < HNSW_MAX_VECTORS:
+        index = faiss.IndexHNSWFlat(dimension, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    else:
+        nlist = int(math.sqrt(len(embeddings)))
+        quantizer = faiss.IndexFlatIP(dimension)
+        index = faiss.IndexIVFPQ(quantizer, dimension, nlist, dimension // 8, 8, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    # HNSW graph construction is the slow part, add in chunks to report progress
+    for start in tqdm(range(0, len(embeddings), ADD_BATCH_SIZE), desc="Adding to index"):
+        index.add(embeddings[start : start + ADD_BATCH_SIZE])
+    logger.info(f"✅ FAISS Index created ({type(index).__name__}). Total vectors: {index.ntotal}")
+    
+    # Exact copy of the vectors, used by build_index.py to rebuild other layouts
+    flat_index = faiss.IndexFlatIP(dimension)
+    flat_index.add(embeddings)
+
+    # 7. Document Store (row id == chunk_id == FAISS id)
+    doc_rows = [
+        (c['chunk_id'], c['doc_id'], c['source'], c['position'], c['text'])
+        for c in chunks
+    ]
 
     # 8. Save
     index_path = os.path.join(OUTPUT_DIR, 'index.faiss')
-    metadata_path = os.path.join(OUTPUT_DIR, 'metadata.pkl')
-    texts_path = os.path.join(OUTPUT_DIR, 'texts.pkl')
+    flat_path = os.path.join(OUTPUT_DIR, 'index_flat.faiss')
+    docs_path = os.path.join(OUTPUT_DIR, DOC_STORE_FILE)
 
     faiss.write_index(index, index_path)
-    with open(metadata_path, 'wb') as f: pickle.dump(metadata_store, f)
-    with open(texts_path, 'wb') as f: pickle.dump(text_store, f)
+    faiss.write_index(flat_index, flat_path)
+    write_doc_store(docs_path, doc_rows)
     
     logger.info(f"✅ All artifacts saved to {OUTPUT_DIR}")
 
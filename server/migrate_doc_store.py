@@ -0,0 +1,39 @@
+"""
+Convert a legacy vector store (metadata.pkl + texts.pkl) to docs.sqlite.
+"""
+import os
+import sys
+import pickle
+import logging
+from app.core.doc_store import DOC_STORE_FILE, write_doc_store
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+VECTOR_DIR = './vector_store'
+
+
+def migrate(vector_dir):
+    metadata_path = os.path.join(vector_dir, 'metadata.pkl')
+    texts_path = os.path.join(vector_dir, 'texts.pkl')
+
+    if not (os.path.exists(metadata_path) and os.path.exists(texts_path)):
+        logger.error(f"❌ No pickled stores found in {vector_dir}")
+        sys.exit(1)
+
+    with open(metadata_path, 'rb') as f:
+        metadata_store = pickle.load(f)
+    with open(texts_path, 'rb') as f:
+        text_store = pickle.load(f)
+
+    rows = [
+        (c_id, meta.get('doc_id'), meta.get('source', 'Unknown'), meta.get('position'), text_store.get(c_id, ''))
+        for c_id, meta in sorted(metadata_store.items())
+    ]
+    write_doc_store(os.path.join(vector_dir, DOC_STORE_FILE), rows)
+    logger.info(f"✅ Wrote {len(rows)} chunks to {os.path.join(vector_dir, DOC_STORE_FILE)}")
+
+
+if __name__ == "__main__":
+    migrate(sys.argv[1] if len(sys.argv) > 1 else VECTOR_DIR)